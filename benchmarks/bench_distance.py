@@ -0,0 +1,106 @@
+import argparse
+import json
+import math
+import random
+import time
+
+import numpy as np
+
+from src import geo_distance
+from src import road_source
+
+# Deinze - Nokere area, where the road names in road_all.json come from
+DEFAULT_BBOX = (50.85, 3.40, 51.00, 3.70)
+
+
+def scalar_haversine(lat1, lon1, lat2, lon2):
+    """The scalar `math` version the routing code used before `geo_distance`."""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+    return 2 * math.asin(math.sqrt(a)) * 6371
+
+
+def load_elements(path, bbox):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["elements"], path
+    try:
+        return road_source.OverpassSource().elements(bbox), f"Overpass {bbox}"
+    except Exception as e:
+        print(f"Could not download {bbox} ({e}), using a synthetic road grid instead")
+    random.seed(0)
+    elements = []
+    for i in range(200):
+        ids = []
+        for j in range(200):
+            node_id = i * 200 + j + 1
+            elements.append({"type": "node", "id": node_id, "lat": 50.85 + i * 0.00075 + random.random() * 1e-4,
+                             "lon": 3.40 + j * 0.0015 + random.random() * 1e-4})
+            ids.append(node_id)
+        elements.append({"type": "way", "id": i, "nodes": ids, "tags": {"highway": "secondary"}})
+    return elements, "synthetic 200x200 grid"
+
+
+def timed(func, repeat):
+    best = math.inf
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(elements, repeat=3):
+    nodes = {e["id"]: (e["lat"], e["lon"]) for e in elements if e["type"] == "node"}
+    edges = [(a, b) for e in elements if e["type"] == "way"
+             for a, b in zip(e["nodes"], e["nodes"][1:]) if a in nodes and b in nodes]
+    from_pos = np.array([nodes[a] for a, _ in edges]).reshape(-1, 2)
+    to_pos = np.array([nodes[b] for _, b in edges]).reshape(-1, 2)
+    points = np.array(list(nodes.values()))
+    route = points[: min(len(points), 5000)]
+    query = tuple(points.mean(axis=0))
+    print(f"{len(nodes)} nodes, {len(edges)} edges")
+
+    cases = {
+        "edge lengths": (
+            lambda: [scalar_haversine(a[0], a[1], b[0], b[1]) for a, b in zip(from_pos.tolist(), to_pos.tolist())],
+            lambda: geo_distance.haversine(from_pos[:, 0], from_pos[:, 1], to_pos[:, 0], to_pos[:, 1]),
+        ),
+        "route length": (
+            lambda: sum(scalar_haversine(a[0], a[1], b[0], b[1]) for a, b in zip(route.tolist(), route[1:].tolist())),
+            lambda: geo_distance.polyline_length(route),
+        ),
+        "one to all nodes": (
+            lambda: [scalar_haversine(query[0], query[1], lat, lon) for lat, lon in points.tolist()],
+            lambda: geo_distance.distances_to(query, points),
+        ),
+    }
+    for name, (scalar, vectorized) in cases.items():
+        scalar_time, expected = timed(scalar, repeat)
+        vector_time, result = timed(vectorized, repeat)
+        assert np.allclose(expected, result), name
+        print(f"{name:18s} scalar {scalar_time * 1e3:9.2f}ms  vectorized {vector_time * 1e3:8.2f}ms  "
+              f"x{scalar_time / vector_time:6.1f}")
+
+
+def parser_setter():
+    parser = argparse.ArgumentParser(description="Benchmark scalar vs vectorized haversine distances")
+    parser.add_argument("--elements", type=str, help="Overpass JSON response to measure (python -m src.road_source)")
+    parser.add_argument("--bbox", type=float, nargs=4, default=DEFAULT_BBOX,
+                        metavar=("MIN_LAT", "MIN_LON", "MAX_LAT", "MAX_LON"), help="Area to download otherwise")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs")
+    return parser.parse_args()
+
+
+def main():
+    args = parser_setter()
+    elements, origin = load_elements(args.elements, tuple(args.bbox))
+    print(f"Road data: {origin}")
+    run(elements, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
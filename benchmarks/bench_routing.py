@@ -0,0 +1,271 @@
+import argparse
+import json
+import math
+import platform
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import pairwise
+from pathlib import Path
+
+from src import geocoding
+from src import road_source
+from src import route_render
+from src import segment_routing
+from src.races import RACES
+from src.road_graph import RoadGraph
+from src.route_alternatives import alternative_routes
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+GAZETTEER_FILE = "gazetteer.json"
+ROADS_FILE = "roads.json"
+SYNTHETIC_RACE = "synthetic"
+
+# Stages of one routing run, in order. "alternatives" includes its own shortest path search,
+# "render" assembles the result (points, lengths, road names) and renders folium HTML and GeoJSON.
+STAGES = ("geocode", "parse", "fetch", "build", "nearest", "shortest", "alternatives", "render")
+# The networkx engine (map_function.get_segment_route) builds and searches in one call
+NETWORKX_STAGES = ("geocode", "parse", "fetch", "route")
+
+
+def record(race: str, names: list[str], fixture_dir: Path) -> None:
+    """Geocode a race and download the roads of all its segments once, as fixtures for offline replay."""
+    path = fixture_dir / race
+    path.mkdir(parents=True, exist_ok=True)
+    geocoding.seed_gazetteer(names, path / GAZETTEER_FILE)
+    coords = geocoding.geocode_many(names)
+    waypoints = [coords[name] for name in names]
+    if None in waypoints:
+        raise ValueError(f"Could not geocode every waypoint of {race}")
+    bboxes = [segment_routing.segment_bbox(start, end) for start, end in pairwise(waypoints)]
+    elements = road_source.OverpassSource().union_elements(bboxes)
+    with open(path / ROADS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"elements": elements}, f)
+    print(f"Recorded {race}: {len(names)} waypoints, {len(elements)} elements in {path}")
+
+
+def synthetic_fixture(fixture_dir: Path, size: int = 150) -> list[str]:
+    """Write a synthetic road grid and waypoints, to try the suite without recorded fixtures."""
+    path = fixture_dir / SYNTHETIC_RACE
+    path.mkdir(parents=True, exist_ok=True)
+    random.seed(0)
+    elements = []
+    highways = ("primary", "secondary", "tertiary", "residential")
+    for i in range(size):
+        for j in range(size):
+            elements.append({"type": "node", "id": i * size + j + 1, "lat": 50.85 + i * 0.001 + random.random() * 1e-4,
+                             "lon": 3.40 + j * 0.0015 + random.random() * 1e-4})
+    for i in range(size):
+        row = [i * size + j + 1 for j in range(size)]
+        column = [j * size + i + 1 for j in range(size)]
+        for k, nodes in enumerate((row, column)):
+            elements.append({"type": "way", "id": 2 * i + k, "nodes": nodes,
+                             "tags": {"highway": highways[i % len(highways)], "name": f"Road {2 * i + k}"}})
+    with open(path / ROADS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"elements": elements}, f)
+
+    names = [f"Synthetic {i}" for i in range(6)]
+    span = size * 0.001
+    gazetteer = {name: {"lat": 50.86 + random.random() * span * 0.9, "lon": 3.41 + random.random() * span * 1.3,
+                        "display_name": name} for name in names}
+    with open(path / GAZETTEER_FILE, "w", encoding="utf-8") as f:
+        json.dump(gazetteer, f, indent=4)
+    return names
+
+
+class _Prefetched:
+    """Road source answering with elements fetched beforehand, so fetching is timed on its own."""
+
+    def __init__(self, elements):
+        self._elements = elements
+
+    def covers(self, bbox) -> bool:
+        return True
+
+    def elements(self, bbox) -> list[dict]:
+        return self._elements
+
+
+def replay(names: list[str], path: Path, engine: str = "csr", max_routes: int = 3) -> dict:
+    """
+    Route a race on its fixtures, timing every stage.
+
+    Geocoding answers from the fixture gazetteer and roads from the fixture extract, so no request
+    leaves the machine; a name missing from the gazetteer is an error rather than a live lookup.
+
+    Returns:
+        dict: Seconds per stage plus the size of the race and its graphs.
+    """
+    stages = dict.fromkeys(NETWORKX_STAGES if engine == "networkx" else STAGES, 0.0)
+
+    @contextmanager
+    def stage(name):
+        start = time.perf_counter()
+        yield
+        stages[name] += time.perf_counter() - start
+
+    with stage("geocode"):
+        gazetteer = geocoding.load_gazetteer(path / GAZETTEER_FILE)
+        missing = [name for name in names if geocoding.gazetteer_place(name, gazetteer) is None]
+        if missing:
+            raise ValueError(f"{path / GAZETTEER_FILE} lacks {missing}, record the race again")
+        coords = geocoding.geocode_many(names)
+        waypoints = [coords[name] for name in names]
+
+    with stage("parse"):
+        roads = road_source.ExtractSource(path / ROADS_FILE)
+
+    if engine == "networkx":
+        from src import map_function  # imported here, it pulls in osmnx and matplotlib
+
+    nodes = edges = 0
+    distance = 0.0
+    segments = []
+    for i, (start_point, end_point) in enumerate(pairwise(waypoints)):
+        with stage("fetch"):
+            elements = roads.elements(segment_routing.segment_bbox(start_point, end_point))
+
+        if engine == "networkx":
+            with stage("route"):
+                result = map_function.get_segment_route(start_point, end_point, max_routes, roads=_Prefetched(elements))
+            if isinstance(result, dict):
+                nodes += result["node_count"]
+                edges += result["edge_count"]
+                distance += result["distances"][0]
+            continue
+
+        with stage("build"):
+            graph = RoadGraph.from_elements(elements)
+        nodes += graph.node_count
+        edges += graph.edge_count
+        with stage("nearest"):
+            source = graph.nearest_node(start_point)
+            target = graph.nearest_node(end_point)
+        if source is None or target is None:
+            continue
+        with stage("shortest"):
+            shortest = graph.shortest_path(source, target)
+        if shortest is None:
+            continue
+        with stage("alternatives"):
+            paths = alternative_routes(graph, source, target, max_routes)
+        with stage("render"):
+            routes = [{"points": graph.points(path), "distance": graph.path_length(path),
+                       "road_names": graph.road_names(path)} for path in paths]
+        segments.append({"index": i, "routes": routes})
+        distance += routes[0]["distance"]
+
+    if engine != "networkx":
+        with stage("render"):
+            result = {"waypoints": waypoints, "segments": segments}
+            route_render.render_folium(result).get_root().render()
+            json.dumps(route_render.to_geojson(result))
+
+    return {
+        "stages": stages,
+        "total": sum(stages.values()),
+        "waypoints": len(names),
+        "segments": len(names) - 1,
+        "nodes": nodes,
+        "edges": edges,
+        "distance_km": round(distance, 3),
+    }
+
+
+def run_race(race: str, names: list[str], fixture_dir: Path, engine: str, max_routes: int, repeat: int,
+             memory: bool = True) -> dict:
+    """Best of `repeat` replays per stage, plus the peak traced memory of one more replay."""
+    path = fixture_dir / race
+    runs = [replay(names, path, engine, max_routes) for _ in range(repeat)]
+    report = dict(runs[0])
+    report["stages"] = {name: min(run["stages"][name] for run in runs) for name in runs[0]["stages"]}
+    report["total"] = min(run["total"] for run in runs)
+    if memory:
+        tracemalloc.start()
+        try:
+            replay(names, path, engine, max_routes)
+            report["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return report
+
+
+def print_report(report: dict, baseline: dict | None = None) -> None:
+    for race, result in report["races"].items():
+        print(f"\n{race}: {result['segments']} segments, {result['nodes']} nodes, {result['edges']} edges, "
+              f"{result['distance_km']:.1f}km")
+        before = (baseline or {}).get("races", {}).get(race, {})
+        rows = list(result["stages"].items()) + [("total", result["total"])]
+        for name, seconds in rows:
+            line = f"  {name:13s} {seconds * 1e3:10.1f}ms"
+            old = before.get("stages", {}).get(name) if name != "total" else before.get("total")
+            if old:
+                line += f"   was {old * 1e3:10.1f}ms  x{old / seconds if seconds else math.inf:5.2f}"
+            print(line)
+        if "peak_memory_mb" in result:
+            line = f"  {'peak memory':13s} {result['peak_memory_mb']:10.1f}MB"
+            if before.get("peak_memory_mb"):
+                line += f"   was {before['peak_memory_mb']:10.1f}MB"
+            print(line)
+
+
+def parser_setter():
+    parser = argparse.ArgumentParser(description="Replay recorded races offline and time every routing stage")
+    parser.add_argument("races", type=str, nargs="*", help=f"Races to run, defaults to all of {list(RACES)}")
+    parser.add_argument("--record", action="store_true", help="Geocode and download the fixtures (needs network)")
+    parser.add_argument("--synthetic", action="store_true", help="Run a synthetic grid race, no fixtures needed")
+    parser.add_argument("--fixtures", type=str, default=str(FIXTURE_DIR), help="Fixture directory")
+    parser.add_argument("--engine", type=str, choices=("csr", "networkx"), default="csr",
+                        help="csr: segment_routing/RoadGraph, networkx: map_function.get_segment_route")
+    parser.add_argument("--max-routes", type=int, default=3, help="Routes per segment")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs per stage")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run measuring peak memory")
+    parser.add_argument("-o", "--output", type=str, help="Write the JSON report here")
+    parser.add_argument("--compare", type=str, help="Earlier JSON report to compare against")
+    return parser.parse_args()
+
+
+def main():
+    args = parser_setter()
+    fixture_dir = Path(args.fixtures)
+    races = {race: RACES[race] for race in (args.races or RACES)}
+    if args.synthetic:
+        races = {SYNTHETIC_RACE: synthetic_fixture(fixture_dir)}
+
+    if args.record:
+        for race, names in races.items():
+            record(race, names, fixture_dir)
+        return
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "engine": args.engine,
+        "max_routes": args.max_routes,
+        "repeat": args.repeat,
+        "races": {},
+    }
+    for race, names in races.items():
+        if not (fixture_dir / race / ROADS_FILE).exists():
+            # Recorded fixtures are not committed (they are large and go stale), every checkout records its own
+            print(f"No fixtures for {race} in {fixture_dir}, record them with --record {race} (needs network)")
+            continue
+        report["races"][race] = run_race(race, names, fixture_dir, args.engine, args.max_routes, args.repeat,
+                                         memory=not args.no_memory)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
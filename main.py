@@ -31,6 +31,7 @@ from src import constants
 from src import model_create
 from src import my_tools
 from src import prompt_test
+from src import search_cache
 import litellm
 from phoenix.otel import register
 from openinference.instrumentation.smolagents import SmolagentsInstrumentor
@@ -47,6 +48,7 @@ BROWSER_CONFIG = {
         "timeout": 300,
     },
     "serpapi_key": os.getenv("SERPAPI_API_KEY"),
+    "cached_search": search_cache.cached_search,
 }
 
 
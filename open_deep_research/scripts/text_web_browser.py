@@ -6,7 +6,7 @@ import pathlib
 import re
 import time
 import uuid
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import unquote, urljoin, urlparse
 
 import pathvalidate
@@ -29,6 +29,7 @@ class SimpleTextBrowser:
         downloads_folder: Optional[Union[str, None]] = None,
         serpapi_key: Optional[Union[str, None]] = None,
         request_kwargs: Optional[Union[Dict[str, Any], None]] = None,
+        cached_search: Optional[Callable[..., Any]] = None,
     ):
         self.start_page: str = start_page if start_page else "about:blank"
         self.viewport_size = viewport_size  # Applies only to the standard uri types
@@ -39,6 +40,8 @@ class SimpleTextBrowser:
         self.viewport_pages: List[Tuple[int, int]] = list()
         self.set_address(self.start_page)
         self.serpapi_key = serpapi_key
+        # Optional `cached_search(provider, query, fetch, params=...)`, e.g. src.search_cache.cached_search
+        self.cached_search = cached_search
         self.request_kwargs = request_kwargs
         self.request_kwargs["cookies"] = COOKIES
         self._mdconvert = MarkdownConverter()
@@ -213,8 +216,15 @@ class SimpleTextBrowser:
         if filter_year is not None:
             params["tbs"] = f"cdr:1,cd_min:01/01/{filter_year},cd_max:12/31/{filter_year}"
 
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        if self.cached_search is not None:
+            cache_params = {key: value for key, value in params.items() if key not in ("q", "api_key")}
+            results = self.cached_search(
+                "serp", query, lambda: GoogleSearch(params).get_dict(), params=cache_params,
+                is_cacheable=lambda result: "error" not in result,
+            )
+        else:
+            search = GoogleSearch(params)
+            results = search.get_dict()
         self.page_title = f"{query} - Search"
         if "organic_results" not in results.keys():
             raise Exception(f"No results found for query: '{query}'. Use a less specific query.")
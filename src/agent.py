@@ -21,6 +21,7 @@ from smolagents import (
 )
 from src import prompt_test
 from src import url_function
+from src import search_cache
 
 
 AUTHORIZED_IMPORTS = [
@@ -61,6 +62,7 @@ BROWSER_CONFIG = {
         "timeout": 300,
     },
     "serpapi_key": os.getenv("SERPAPI_API_KEY"),
+    "cached_search": search_cache.cached_search,
 }
 
 
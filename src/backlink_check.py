@@ -8,25 +8,26 @@ import os
 from dotenv import load_dotenv
 from serpapi import GoogleSearch
 import requests
-from bs4 import BeautifulSoup
+import lxml.etree
+import lxml.html
+import threading
 
 load_dotenv()
 import json
 import re
 from duckduckgo_search import DDGS
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 import time
 from urllib.parse import urlparse
 from fake_useragent import UserAgent
 
 from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
 from smolagents import tool
 from src import search_function
+from src import http_client
+from src import hedging
+from src import browser_pool
 
 def get_domain(url):
     parsed_url = urlparse(url)
@@ -38,52 +39,90 @@ def get_main_domain(url):
     return f"{extracted.domain}.{extracted.suffix}"
 
 
+HEDGE_DELAY = 3.0  # seconds the scraper gets before an API provider is fired as well
+
+# One breaker per provider, shared by every call, so a provider that keeps answering 429 is skipped
+BREAKERS = {
+    "google": hedging.CircuitBreaker("google", failure_threshold=2, cooldown=600),
+    "serperapi": hedging.CircuitBreaker("serperapi"),
+    "serpapi": hedging.CircuitBreaker("serpapi"),
+}
+
+
+def google_scrape(query: str, threshold: int = 5) -> list:
+    """Scrape Google results for `query`, stopping after `threshold` results. Raises HTTPError on 429."""
+    search_results = []
+    for result in search(
+        query, stop=10, pause=2, extra_params={'filter': '1'}, user_agent=googlesearch.get_random_user_agent()
+    ):
+        search_results.append(result)
+        if len(search_results) >= threshold:  # Threshold can be adjusted
+            break
+    return search_results
+
+
 @tool
-def verify_url(url_to_check: str, provider: str = "serperapi") -> list:
+def verify_url(url_to_check: str, provider: str = "serperapi", hedge_delay: float = HEDGE_DELAY) -> list:
     """
     Verify if a URL appears in search results that link to Domain.
     Args:
         url_to_check: The URL to check
         provider: The search engine provider to use (default is "serperapi")
+        hedge_delay: Seconds to wait for the Google scraper before also querying the API provider
     Returns:
         A list of URLs found in the search results
     """
-    # List to store search result URLs
-    search_results = []
     domain_url = get_domain(url_to_check)
     # Search Google for the URL
     query = f'"intext:{domain_url} -site:{domain_url}"'
     print(f"Searching for: {query}")
 
+    # API errors (e.g. a 429) must raise, so the breaker counts them and the scraper can still win
+    if provider == "serperapi":
+        api_search = lambda: search_function.search_serper(domain_url, raise_errors=True)
+    else:
+        provider = "serpapi"
+        api_search = lambda: search_function.search_serp(domain_url, raise_errors=True)
+
+    # Race the scraper against the API provider: whichever answers first wins
     try:
-        for result in search(
-            query, stop=10, pause=2, extra_params={'filter': '1'}, user_agent=googlesearch.get_random_user_agent()
-        ):
-            search_results.append(result)
-            # Check the number of results (this could be improved to check for reputable sites)
-            if len(search_results) >= 5:  # Threshold can be adjusted
-                print(f"URL appears {len(search_results)} times, which is a good sign!")
-                return search_results
-        else:
-            print(f"URL appears {len(search_results)} times, which might not be enough.")
-            return search_results
+        search_results = hedging.hedged_call(
+            [(BREAKERS["google"], lambda: google_scrape(query)), (BREAKERS[provider], api_search)],
+            hedge_delay=hedge_delay,
+        )
     except urllib.error.HTTPError:
-        print("HTTPError: Too many requests. try API")
-        if provider == "serperapi":
-            search_results = search_function.search_serper(domain_url)
-        else:
-            search_results = search_function.search_serp(domain_url)
+        print("HTTPError: Too many requests.")
+        return []
+    except Exception as e:
+        print(f"Search error: {e}")
+        return []
+
+    if len(search_results) >= 5:
+        print(f"URL appears {len(search_results)} times, which is a good sign!")
+    else:
+        print(f"URL appears {len(search_results)} times, which might not be enough.")
     return search_results
 
 
-def get_seo_backlinks(target_url, max_results=100, delay=2):
+RESULTS_PER_PAGE = 25
+FETCH_WORKERS = 4
+
+
+def get_seo_backlinks(target_url, max_results=100, delay=2, max_pages=None):
     """
     Find backlinks to a website using DuckDuckGo for SEO analysis.
 
+    Result pages are fetched ahead by a small pool under a token-bucket rate limit (one page per
+    `delay` seconds) and parsed with lxml on a separate thread. Backlinks are deduplicated by linking
+    domain as they arrive, and crawling stops as soon as `max_results` domains have been found, or
+    once a page comes back empty (pages queued behind it are then no longer fetched).
+
     Args:
         target_url (str): Target URL or domain to check backlinks for
-        max_results (int): Maximum number of backlinks to retrieve
-        delay (int): Delay between requests in seconds
+        max_results (int): Maximum number of backlinks (unique linking domains) to retrieve
+        delay (int): Minimum delay between page requests in seconds
+        max_pages (int): Maximum number of result pages to fetch, defaults to twice what
+            `max_results` needs, since duplicate domains are dropped
 
     Returns:
         list: List of dictionaries containing backlink information
@@ -111,98 +150,139 @@ def get_seo_backlinks(target_url, max_results=100, delay=2):
         'Upgrade-Insecure-Requests': '1',
     }
 
-    backlinks = []
-    results_per_page = 25
-    max_pages = (max_results + results_per_page - 1) // results_per_page
+    if max_pages is None:
+        max_pages = 2 * ((max_results + RESULTS_PER_PAGE - 1) // RESULTS_PER_PAGE)
+    limiter = http_client.RateLimiter(1.0 / delay) if delay > 0 else None
 
     print(f"Searching for backlinks to: {domain}")
     print(f"Query: {query}")
 
-    for page in range(max_pages):
-        start_index = page * results_per_page
-        search_url = f"https://html.duckduckgo.com/html/?q={encoded_query}&s={start_index}"
-        print(search_url)
-        try:
-            print(f"Fetching results page {page + 1}...")
-            response = requests.get(search_url, headers=headers)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Find all search results
-            results = soup.find_all('div', class_='result__body')
+    # First page known to have no results, the pages fetched ahead after it are skipped
+    last_page = [max_pages]
+    last_page_lock = threading.Lock()
+
+    def exhausted_at(page):
+        with last_page_lock:
+            last_page[0] = min(last_page[0], page)
+
+    def fetch_page(page):
+        if page > last_page[0]:
+            return ""
+        if limiter is not None:
+            limiter.acquire()  # Rate limit page requests to avoid being blocked
+            if page > last_page[0]:
+                return ""
+        search_url = f"https://html.duckduckgo.com/html/?q={encoded_query}&s={page * RESULTS_PER_PAGE}"
+        print(f"Fetching results page {page + 1}: {search_url}")
+        response = http_client.get(search_url, headers=headers)
+        response.raise_for_status()
+        if not response.text.strip():
+            exhausted_at(page)
+        return response.text
 
+    backlinks = []
+    seen_domains = set()
+    fetchers = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="backlink-fetch")
+    parser = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backlink-parse")
+    try:
+        pages = [fetchers.submit(fetch_page, page) for page in range(max_pages)]
+        parsed = [parser.submit(lambda page=page: parse_backlink_page(page.result(), domain)) for page in pages]
+
+        for page, page_results in enumerate(parsed):
+            try:
+                results = page_results.result()
+            except requests.exceptions.RequestException as e:
+                print(f"Request error: {e}")
+                break
             if not results:
+                exhausted_at(page)
                 print("No more results found.")
                 break
 
-            for result in results:
-                try:
-                    # Extract title
-                    title_elem = result.find('a', class_='result__a')
-                    title = title_elem.get_text().strip() if title_elem else "No Title"
-
-                    # Extract URL
-                    url_elem = result.find('a', class_='result__url')
-                    if not url_elem:
-                        continue
-
-                    # Handle DuckDuckGo URL format
-                    raw_url = url_elem.get('href', '')
-                    if '/rd/' in raw_url or '/l/' in raw_url:
-                        # Parse and decode the actual URL from DuckDuckGo's redirect
-                        parsed = urlparse(raw_url)
-                        if 'uddg' in parse_qs(parsed.query):
-                            actual_url = parse_qs(parsed.query)['uddg'][0]
-                        else:
-                            # Try to extract from path
-                            match = re.search(r'uddg=([^&]+)', raw_url)
-                            if match:
-                                actual_url = urllib.parse.unquote(match.group(1))
-                            else:
-                                actual_url = raw_url
-                    else:
-                        actual_url = raw_url
-
-                    # Clean and normalize URL
-                    parsed_url = urlparse(actual_url)
-                    linking_domain = parsed_url.netloc
-
-                    # Skip if the linking domain is the same as target domain
-                    if linking_domain == domain or linking_domain == 'www.' + domain:
-                        continue
-
-                    # Extract snippet/description
-                    snippet_elem = result.find('a', class_='result__snippet')
-                    snippet = snippet_elem.get_text().strip() if snippet_elem else "No description"
-
-                    # Add to backlinks list
-                    backlink_info = {'title': title, 'url': actual_url, 'domain': linking_domain, 'snippet': snippet}
-
-                    backlinks.append(backlink_info)
-
-                    # Check if we've reached the maximum requested results
-                    if len(backlinks) >= max_results:
-                        break
-
-                except Exception as e:
-                    print(f"Error processing result: {e}")
+            for backlink_info in results:
+                if backlink_info['domain'] in seen_domains:
                     continue
+                seen_domains.add(backlink_info['domain'])
+                backlinks.append(backlink_info)
+                if len(backlinks) >= max_results:
+                    break
 
             # Check if we've reached the maximum requested results
             if len(backlinks) >= max_results:
                 break
+    finally:
+        # Pages fetched ahead are no longer needed
+        fetchers.shutdown(wait=False, cancel_futures=True)
+        parser.shutdown(wait=False, cancel_futures=True)
 
-            # Add delay between pages to avoid rate limiting
-            time.sleep(delay)
+    return backlinks
 
-        except requests.exceptions.RequestException as e:
-            print(f"Request error: {e}")
-            break
 
+def parse_backlink_page(html, domain):
+    """
+    Parse one DuckDuckGo HTML results page into backlink dictionaries.
+
+    Args:
+        html (str): The results page.
+        domain (str): Target domain, results on it (or its www. host) are skipped.
+
+    Returns:
+        list: Dictionaries with `title`, `url`, `domain` and `snippet`, in page order.
+    """
+    try:
+        tree = lxml.html.fromstring(html)
+    except lxml.etree.ParserError:
+        return []  # Empty page, e.g. past the last results page
+    backlinks = []
+    for result in tree.xpath(_RESULT_BODY_XPATH):
+        try:
+            # Extract title
+            title_elem = result.xpath(_class_xpath('a', 'result__a'))
+            title = title_elem[0].text_content().strip() if title_elem else "No Title"
+
+            # Extract URL
+            url_elem = result.xpath(_class_xpath('a', 'result__url'))
+            if not url_elem:
+                continue
+            actual_url = decode_duckduckgo_url(url_elem[0].get('href', ''))
+
+            # Skip if the linking domain is the same as target domain
+            linking_domain = urlparse(actual_url).netloc
+            if linking_domain == domain or linking_domain == 'www.' + domain:
+                continue
+
+            # Extract snippet/description
+            snippet_elem = result.xpath(_class_xpath('a', 'result__snippet'))
+            snippet = snippet_elem[0].text_content().strip() if snippet_elem else "No description"
+
+            backlinks.append({'title': title, 'url': actual_url, 'domain': linking_domain, 'snippet': snippet})
+        except Exception as e:
+            print(f"Error processing result: {e}")
+            continue
     return backlinks
 
 
+def decode_duckduckgo_url(raw_url):
+    """Return the target of a DuckDuckGo redirect link (`/l/?uddg=...`), or the URL itself."""
+    if '/rd/' not in raw_url and '/l/' not in raw_url:
+        return raw_url
+    uddg = parse_qs(urlparse(raw_url).query).get('uddg')
+    if uddg:
+        return uddg[0]
+    # Try to extract from path
+    match = re.search(r'uddg=([^&]+)', raw_url)
+    if match:
+        return urllib.parse.unquote(match.group(1))
+    return raw_url
+
+
+def _class_xpath(tag, class_name):
+    return f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+
+_RESULT_BODY_XPATH = _class_xpath('div', 'result__body')
+
+
 def analyze_backlinks(backlinks):
     """Analyze backlinks for SEO insights"""
     if not backlinks:
@@ -242,53 +322,58 @@ def ddgs_search(url_to_check):
 
 
 
-def verify_url_selenium(url_to_check, threshold=3):
-    domain_url = get_domain(url_to_check)
-    query = f'{domain_url} -site:{domain_url}'
-    print(query)
-    ua = UserAgent()
-    user_agent = ua.random
+def verify_url_selenium(url_to_check, threshold=3, pool=None):
+    """
+    Check in a real browser whether other sites link to a URL's domain at least `threshold` times.
 
-    options = Options()
-    options.add_argument("--headless")  # Run in headless mode
-    options.add_argument(f"user-agent={user_agent}")
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    The search runs on a warm headless browser from the shared pool (see `browser_pool`) and waits
+    for the results explicitly instead of sleeping, so many URLs can be checked without launching
+    Chrome for each one.
 
-    # search_url = f"https://www.google.com/search?q={query}"=
-    search_url = f"https://html.duckduckgo.com/html/?q={query}"
-    print(f"Searching for: {search_url}")
-    driver.get(search_url)
+    Args:
+        url_to_check (str): The URL whose domain is searched for.
+        threshold (int): Number of linking results needed.
+        pool (BrowserPool): Pool to use, defaults to the shared one.
 
-    search_results = []
+    Returns:
+        bool: True if at least `threshold` results mention the domain.
+    """
+    domain_url = get_domain(url_to_check)
+    query = f'{domain_url} -site:{domain_url}'
+    print(query)
     results_per_page = 10
     max_pages = (threshold + results_per_page - 1) // results_per_page
-    time.sleep(5)  # Wait for the page to load
-    for page in range(max_pages):
-        results = driver.find_elements(By.CSS_SELECTOR, 'div')
-        print(results)
-        if not results:
-            print("No more results found.")
-            break
-        for result in results:
-            link = result.find_element(By.TAG_NAME, 'a').get_attribute('href')
-            if domain_url in link:
-                search_results.append(link)
-                if len(search_results) >= threshold:
-                    driver.quit()
-                    return True
-
-        next_button = driver.find_element(By.CSS_SELECTOR, 'a.result--more__btn')
-        if next_button:
-            next_button.click()
-            time.sleep(2)  # Add delay to avoid rate limiting
-        else:
-            break
-
-    driver.quit()
-    return len(search_results) >= threshold
 
+    def search(page):
+        search_url = f"https://html.duckduckgo.com/html/?q={urllib.parse.quote(query)}"
+        print(f"Searching for: {search_url}")
+        page.goto(search_url, wait_until="domcontentloaded")
 
+        search_results = []
+        for _ in range(max_pages):
+            try:
+                page.wait_for_selector("a.result__a, .no-results")  # Wait for the results to render
+            except PlaywrightTimeoutError:
+                break
+            links = page.locator("a.result__a")
+            if links.count() == 0:
+                print("No more results found.")
+                break
+            for link in links.all():
+                href = link.get_attribute('href') or ''
+                if domain_url in decode_duckduckgo_url(href):
+                    search_results.append(href)
+                    if len(search_results) >= threshold:
+                        return True
+
+            next_button = page.locator("div.nav-link input[type=submit][value=Next]")
+            if next_button.count() == 0:
+                break
+            with page.expect_navigation(wait_until="domcontentloaded"):
+                next_button.first.click()
+        return len(search_results) >= threshold
 
+    return (pool or browser_pool.get_pool()).run(search, context_options={"user_agent": UserAgent().random})
 
 
 if __name__ == '__main__':
@@ -0,0 +1,195 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from src import disk_cache
+from src import signal_engine
+from src import url_function
+
+# Default number of requests in flight per remote host across the whole batch
+HOST_LIMITS = {
+    "serper": 4,
+    "whois": 2,
+    "wikipedia": 4,
+}
+TARGET_HOST_LIMIT = 2
+
+
+def read_rows(path: str | Path) -> Iterator[tuple[str, str]]:
+    """
+    Read (event_name, url) rows from a JSONL or CSV file.
+
+    JSONL lines are objects with `event_name` and `url` keys. CSV files need a header row with
+    the same two columns.
+
+    Args:
+        path: Path of the `.jsonl` or `.csv` input file.
+
+    Returns:
+        Iterator of (event_name, url) tuples.
+    """
+    path = Path(path)
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.suffix.lower() == ".csv":
+            records = csv.DictReader(file)
+        else:
+            records = (json.loads(line) for line in file if line.strip())
+        for record in records:
+            yield record["event_name"].strip(), record["url"].strip()
+
+
+def compact_output(output_path: str | Path) -> set[tuple[str, str]]:
+    """
+    Rewrite an output JSONL file with one scored line per (event_name, url) pair before resuming.
+
+    Lines of rows that crashed (no score) and a partial last line are dropped, since those rows are
+    verified again and would otherwise appear twice in the output.
+
+    Returns:
+        set: The (event_name, url) pairs already verified.
+    """
+    done = set()
+    output_path = Path(output_path)
+    if not output_path.exists():
+        return done
+    kept = []
+    with open(output_path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial last line from a crashed run, the row is redone
+            key = (record.get("event_name"), record.get("url"))
+            if record.get("score") is None or key in done:
+                continue
+            done.add(key)
+            kept.append(line if line.endswith("\n") else line + "\n")
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as file:
+        file.writelines(kept)
+    os.replace(temp_path, output_path)
+    return done
+
+
+def verify_row(event_name: str, url: str, limiter: signal_engine.HostLimiter, **kwargs) -> dict:
+    """Verify one row with the same scoring as `url_function.verify_event_website`."""
+    try:
+        return url_function.verify_event_website(event_name, url, limiter=limiter, **kwargs)
+    except Exception as e:
+        return {"event_name": event_name, "url": url, "error": f"An error occurred: {e}", "score": None}
+
+
+def verify_batch(
+    rows: Iterable[tuple[str, str]],
+    output_path: str | Path,
+    workers: int = 8,
+    host_limits: Optional[dict[str, int]] = None,
+    target_host_limit: int = TARGET_HOST_LIMIT,
+    resume: bool = True,
+    signal_timeout: float = url_function.SIGNAL_TIMEOUT,
+    total_timeout: float = url_function.TOTAL_TIMEOUT,
+) -> dict:
+    """
+    Verify many (event_name, url) pairs, streaming each result to a JSONL file as it finishes.
+
+    Args:
+        rows: The (event_name, url) pairs to verify.
+        output_path: JSONL file results are appended to.
+        workers: Number of rows verified at the same time.
+        host_limits: Requests in flight per named host ("serper", "whois", "wikipedia").
+        target_host_limit: Requests in flight per target website host.
+        resume: Skip rows already verified in `output_path`, dropping its lines of crashed rows.
+        signal_timeout: Seconds allowed for each signal.
+        total_timeout: Seconds allowed for each row, the same default as `url_function.verify_event_website`.
+
+    Returns:
+        dict: Summary with the number of rows verified, skipped, elapsed seconds and rows per second.
+    """
+    limiter = signal_engine.HostLimiter(host_limits or HOST_LIMITS, default_limit=target_host_limit)
+    done = compact_output(output_path) if resume else set()
+    pending = []
+    skipped = 0
+    for row in rows:
+        if row in done:
+            skipped += 1
+            continue
+        done.add(row)
+        pending.append(row)
+
+    print(f"Verifying {len(pending)} rows ({skipped} already done)")
+    write_lock = threading.Lock()
+    start = time.perf_counter()
+    verified = 0
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as output, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify") as executor:
+        futures = [
+            executor.submit(
+                verify_row, event_name, url, limiter,
+                signal_timeout=signal_timeout, total_timeout=total_timeout,
+            )
+            for event_name, url in pending
+        ]
+        for future in as_completed(futures):
+            details = future.result()
+            with write_lock:
+                output.write(json.dumps(details, default=str) + "\n")
+                output.flush()
+            verified += 1
+            elapsed = time.perf_counter() - start
+            print(f"[{verified}/{len(pending)}] {details.get('event_name')} {details.get('url')} "
+                  f"score={details.get('score')} ({verified / elapsed:.2f} rows/s)")
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "verified": verified,
+        "skipped": skipped,
+        "elapsed": elapsed,
+        "rows_per_second": verified / elapsed if elapsed > 0 else 0.0,
+    }
+    print(f"Verified {verified} rows in {elapsed:.1f}s ({summary['rows_per_second']:.2f} rows/s)")
+    return summary
+
+
+def parser_setter():
+    parser = argparse.ArgumentParser(description="Verify official websites for many events")
+    parser.add_argument("input", type=str, help="JSONL or CSV file with event_name and url columns")
+    parser.add_argument("-o", "--output", type=str, required=True, help="JSONL file results are appended to")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="Rows verified at the same time")
+    parser.add_argument("--serper-limit", type=int, default=HOST_LIMITS["serper"], help="Concurrent Serper requests")
+    parser.add_argument("--whois-limit", type=int, default=HOST_LIMITS["whois"], help="Concurrent WHOIS lookups")
+    parser.add_argument("--wikipedia-limit", type=int, default=HOST_LIMITS["wikipedia"], help="Concurrent Wikipedia requests")
+    parser.add_argument("--target-limit", type=int, default=TARGET_HOST_LIMIT, help="Concurrent requests per target site")
+    parser.add_argument("--signal-timeout", type=float, default=url_function.SIGNAL_TIMEOUT, help="Seconds per signal")
+    parser.add_argument("--total-timeout", type=float, default=url_function.TOTAL_TIMEOUT, help="Seconds per row")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of resuming")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached WHOIS/SSL lookups and re-query them")
+    return parser.parse_args()
+
+
+def main():
+    args = parser_setter()
+    disk_cache.get_cache("lookups").refresh = args.refresh
+    verify_batch(
+        read_rows(args.input),
+        args.output,
+        workers=args.workers,
+        host_limits={
+            "serper": args.serper_limit,
+            "whois": args.whois_limit,
+            "wikipedia": args.wikipedia_limit,
+        },
+        target_host_limit=args.target_limit,
+        resume=not args.no_resume,
+        signal_timeout=args.signal_timeout,
+        total_timeout=args.total_timeout,
+    )
+
+
+if __name__ == '__main__':
+    main()
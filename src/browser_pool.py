@@ -0,0 +1,210 @@
+import atexit
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from playwright.sync_api import Error as PlaywrightError
+from playwright.sync_api import sync_playwright
+
+POOL_SIZE = 2  # browsers kept warm
+MAX_PAGES_PER_BROWSER = 50  # a browser is restarted after this many pages to bound its memory
+PAGE_TIMEOUT = 15_000  # default timeout of explicit waits, in milliseconds
+CRASH_RETRIES = 1  # a task whose browser crashed is retried on a fresh browser this many times
+RUN_TIMEOUT = 120  # seconds `run` waits for a task before giving up
+
+
+class BrowserPool:
+    """
+    Bounded pool of warm headless Chromium browsers.
+
+    Each browser lives on its own worker thread (Playwright's sync API must be used from the thread
+    that started it). A task gets a fresh, isolated browser context and page on one of the warm
+    browsers, so launching Chrome is paid once per `max_pages` pages instead of once per URL.
+    A browser that crashed or disconnected is relaunched and the task retried. If Playwright or
+    Chromium cannot be started at all (e.g. not installed), the pool is broken: the task and every
+    queued or later task fail with that error instead of waiting forever.
+    """
+
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        max_pages: int = MAX_PAGES_PER_BROWSER,
+        headless: bool = True,
+        page_timeout: float = PAGE_TIMEOUT,
+        launch_options: Optional[dict] = None,
+    ):
+        self.size = size
+        self.max_pages = max_pages
+        self.headless = headless
+        self.page_timeout = page_timeout
+        self.launch_options = launch_options or {}
+        self._tasks: queue.Queue = queue.Queue()
+        self._workers: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._broken: Optional[BaseException] = None
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+            while len(self._workers) < self.size:
+                worker = threading.Thread(
+                    target=self._work, name=f"browser-{len(self._workers)}", daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, task: Callable[..., Any], *args, context_options: Optional[dict] = None, **kwargs) -> Future:
+        """
+        Run `task(page, *args, **kwargs)` on a pooled browser.
+
+        Args:
+            task: Receives a fresh Playwright page; its context is closed when the task returns.
+            context_options: Options of the browser context, e.g. {"user_agent": ...}.
+
+        Returns:
+            Future: Resolves to the task's return value.
+        """
+        future = Future()
+        with self._lock:
+            broken = self._broken
+        if broken is not None:
+            future.set_exception(broken)
+            return future
+        self._start()
+        self._tasks.put((future, task, args, kwargs, context_options or {}))
+        return future
+
+    def run(self, task: Callable[..., Any], *args, context_options: Optional[dict] = None,
+            timeout: Optional[float] = RUN_TIMEOUT, **kwargs) -> Any:
+        """
+        Run a task on a pooled browser and wait for its result, see `submit`.
+
+        Raises:
+            concurrent.futures.TimeoutError: The task did not finish within `timeout` seconds.
+        """
+        future = self.submit(task, *args, context_options=context_options, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        finally:
+            future.cancel()  # a task still queued is skipped
+
+    def close(self) -> None:
+        """Stop the workers and their browsers once the queued tasks are done."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._tasks.put(None)
+        for worker in workers:
+            worker.join()
+
+    def _fail(self, error: BaseException, future: Optional[Future] = None) -> None:
+        """Mark the pool broken and fail `future` and every queued task with `error`."""
+        print(f"Browser pool cannot start a browser: {error}")
+        with self._lock:
+            self._broken = error
+        if future is not None:
+            future.set_exception(error)
+        while True:
+            try:
+                item = self._tasks.get_nowait()
+            except queue.Empty:
+                return
+            if item is None:
+                self._tasks.put(None)  # a shutdown signal for another worker
+                return
+            if item[0].set_running_or_notify_cancel():
+                item[0].set_exception(error)
+
+    def _work(self) -> None:
+        try:
+            playwright = sync_playwright().start()
+        except Exception as e:
+            self._fail(e)
+            return
+        browser = None
+        pages = 0
+        try:
+            while True:
+                item = self._tasks.get()
+                if item is None:
+                    return
+                future, task, args, kwargs, context_options = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                with self._lock:
+                    broken = self._broken
+                if broken is not None:
+                    future.set_exception(broken)
+                    continue
+
+                for attempt in range(CRASH_RETRIES + 1):
+                    if browser is None or not browser.is_connected() or pages >= self.max_pages:
+                        try:
+                            browser = self._relaunch(playwright, browser)
+                        except Exception as e:
+                            browser = None
+                            self._fail(e, future)
+                            break
+                        pages = 0
+                    pages += 1
+                    try:
+                        result = self._run_task(browser, task, args, kwargs, context_options)
+                    except PlaywrightError as e:
+                        if browser.is_connected() or attempt == CRASH_RETRIES:
+                            future.set_exception(e)
+                            break
+                        print(f"Browser crashed ({e}), relaunching")
+                    except Exception as e:
+                        future.set_exception(e)
+                        break
+                    else:
+                        future.set_result(result)
+                        break
+        finally:
+            if browser is not None:
+                self._quietly_close(browser)
+            playwright.stop()
+
+    def _relaunch(self, playwright, browser):
+        if browser is not None:
+            self._quietly_close(browser)
+        return playwright.chromium.launch(headless=self.headless, **self.launch_options)
+
+    def _run_task(self, browser, task, args, kwargs, context_options):
+        context = browser.new_context(**context_options)
+        try:
+            context.set_default_timeout(self.page_timeout)
+            page = context.new_page()
+            return task(page, *args, **kwargs)
+        finally:
+            try:
+                context.close()
+            except PlaywrightError:
+                pass  # the browser is gone, it is relaunched on the next task
+
+    @staticmethod
+    def _quietly_close(browser) -> None:
+        try:
+            browser.close()
+        except PlaywrightError:
+            pass
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool:
+    """Return the browser pool shared by every module."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
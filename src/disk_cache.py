@@ -0,0 +1,126 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+CACHE_DIR = Path(os.getenv("AGENT_CACHE_DIR", ".cache"))
+
+MISSING = object()
+
+
+class DiskCache:
+    """
+    Small persistent key-value store with a TTL per entry, backed by SQLite.
+
+    Entries are grouped by namespace (e.g. "whois", "ssl") so each kind of lookup gets its own TTL.
+    Failures can be cached too ("negative caching") with a shorter TTL so a dead domain is not
+    re-queried on every run. Setting `refresh` makes every read a miss while still writing fresh
+    values, which is how callers force a re-query. With `compress`, values are stored zlib-compressed.
+    """
+
+    def __init__(self, path: str | Path, refresh: bool = False, compress: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.refresh = refresh
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB, expires REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._conn.commit()
+
+    def get(self, namespace: str, key: str, default: Any = MISSING) -> Any:
+        """Return the cached value, or `default` when it is missing, expired or `refresh` is set."""
+        if self.refresh:
+            return default
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is None:
+                return default
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                self._conn.commit()
+                return default
+        return self._decode(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """Store a JSON-serializable value for `ttl` seconds."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                (namespace, key, self._encode(value), time.time() + ttl),
+            )
+            self._conn.commit()
+
+    def _encode(self, value: Any) -> bytes:
+        data = json.dumps(value).encode("utf-8")
+        return zlib.compress(data) if self.compress else data
+
+    def _decode(self, data: bytes | str) -> Any:
+        if isinstance(data, bytes) and self.compress:
+            data = zlib.decompress(data)
+        return json.loads(data)
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """Remove every entry, or only the entries of one namespace."""
+        with self._lock:
+            if namespace is None:
+                self._conn.execute("DELETE FROM entries")
+            else:
+                self._conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+
+    def cached(
+        self,
+        namespace: str,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: float,
+        negative_ttl: Optional[float] = None,
+        is_negative: Callable[[Any], bool] = lambda value: value is None,
+    ) -> Any:
+        """
+        Return the cached value for `key`, computing and storing it on a miss.
+
+        Args:
+            namespace: Group of the entry, e.g. "whois".
+            key: Cache key within the namespace.
+            compute: Called on a miss to produce the value.
+            ttl: Seconds a successful value stays valid.
+            negative_ttl: Seconds a failed value (see `is_negative`) stays valid, None to not cache failures.
+            is_negative: Tells whether a computed value is a failure.
+
+        Returns:
+            The cached or freshly computed value.
+        """
+        value = self.get(namespace, key)
+        if value is not MISSING:
+            return value
+        value = compute()
+        if not is_negative(value):
+            self.set(namespace, key, value, ttl)
+        elif negative_ttl is not None:
+            self.set(namespace, key, value, negative_ttl)
+        return value
+
+
+_caches: dict[str, DiskCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, compress: bool = False) -> DiskCache:
+    """Return the shared cache stored as `<CACHE_DIR>/<name>.sqlite`."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = DiskCache(CACHE_DIR / f"{name}.sqlite", compress=compress)
+        return _caches[name]
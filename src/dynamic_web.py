@@ -1,4 +1,7 @@
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
+
+from src import browser_pool
 # import easyocr
 
 
@@ -24,26 +27,50 @@ def is_captcha_present(page):
 
 
 
+def check_captcha(url, pool=None):
+    """
+    Open a URL on a pooled headless browser and tell whether it shows a CAPTCHA.
+
+    Args:
+        url (str): The page to check.
+        pool (BrowserPool): Pool to use, defaults to the shared one.
+
+    Returns:
+        bool: True if a CAPTCHA was detected.
+    """
+    def task(page):
+        page.goto(url, wait_until="domcontentloaded")
+        try:
+            # Explicit wait: CAPTCHA widgets are injected by scripts after the DOM is ready
+            page.wait_for_load_state("networkidle", timeout=5000)
+        except PlaywrightTimeoutError:
+            pass
+        return is_captcha_present(page)
+
+    return (pool or browser_pool.get_pool()).run(task)
+
+
 # reader = easyocr.Reader(['en'])
-with sync_playwright() as p:
-    browser = p.chromium.launch(headless=False)
-    page = browser.new_page()
+if __name__ == "__main__":
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=False)
+        page = browser.new_page()
 
-    # Visit the dynamic website
-    query = "example search"
-    num_results = 10
-    google_search = "https://www.google.com/search?q=" + query + "&num=" + str(num_results)
-    tour_de_france = "https://www.letour.fr/en/"
-    page.goto(tour_de_france, wait_until="networkidle")
-    page.get_by_role("button", name="Teams").click()
+        # Visit the dynamic website
+        query = "example search"
+        num_results = 10
+        google_search = "https://www.google.com/search?q=" + query + "&num=" + str(num_results)
+        tour_de_france = "https://www.letour.fr/en/"
+        page.goto(tour_de_france, wait_until="networkidle")
+        page.get_by_role("button", name="Teams").click()
 
-    page.get_by_label("Alpecin-Deceuninck").click()
+        page.get_by_label("Alpecin-Deceuninck").click()
 
 
-    if is_captcha_present(page):
-        print("CAPTCHA detected, handle it!")
-    else:
-        print("No CAPTCHA detected.")
-    page.pause()
+        if is_captcha_present(page):
+            print("CAPTCHA detected, handle it!")
+        else:
+            print("No CAPTCHA detected.")
+        page.pause()
 
-    browser.close()
\ No newline at end of file
+        browser.close()
@@ -0,0 +1,43 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in km between points given in degrees.
+
+    Arguments may be scalars or NumPy arrays and are broadcast against each other, so one call
+    measures whole coordinate arrays.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _as_points(points) -> np.ndarray:
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def polyline_distances(points) -> np.ndarray:
+    """Distances in km between consecutive (lat, lon) points of a polyline."""
+    points = _as_points(points)
+    return haversine(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1])
+
+
+def polyline_length(points) -> float:
+    """Length in km of a polyline of (lat, lon) points."""
+    return float(polyline_distances(points).sum())
+
+
+def distances_to(point, points) -> np.ndarray:
+    """Distances in km from one (lat, lon) point to each of many."""
+    points = _as_points(points)
+    return haversine(point[0], point[1], points[:, 0], points[:, 1])
+
+
+def distance_matrix(points_a, points_b) -> np.ndarray:
+    """Distances in km between every point of `points_a` (rows) and every point of `points_b` (columns)."""
+    points_a = _as_points(points_a)
+    points_b = _as_points(points_b)
+    return haversine(points_a[:, 0, None], points_a[:, 1, None], points_b[None, :, 0], points_b[None, :, 1])
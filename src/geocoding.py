@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from src import disk_cache
+from src import http_client
+from src.search_cache import normalize_query
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+USER_AGENT = "MainRoadFinder/1.0"
+GEOCODE_TTL = 90 * 24 * 3600  # towns do not move
+NEGATIVE_TTL = 24 * 3600  # unknown addresses are retried after a day
+MAX_GEOCODE_WORKERS = 4  # requests overlap their latency, the shared limiter keeps Nominatim at 1 req/s
+
+GAZETTEER_PATH = Path(os.getenv("GAZETTEER_PATH", "gazetteer.json"))
+GLOSSARY_PATH = Path("map_glossary_ref.json")
+GLOSSARY_PLACE_KEYS = ("key_waypoints", "feed_zones")
+
+_gazetteer: Optional[dict[str, dict]] = None
+_gazetteer_lock = threading.Lock()
+
+
+def normalize_address(address: str) -> str:
+    """Normalize an address so "Deinze,Belgium" and " deinze ,  BELGIUM" share a cache entry."""
+    return re.sub(r"\s*,\s*", ", ", normalize_query(address))
+
+
+def place_key(address: str) -> str:
+    """
+    Normalized address without the regions between place and country, so "Nokere, Flanders, Belgium"
+    finds a gazetteer entry seeded as "Nokere, Belgium". Addresses of one or two parts are unchanged.
+    """
+    parts = normalize_address(address).split(", ")
+    return f"{parts[0]}, {parts[-1]}" if len(parts) > 2 else ", ".join(parts)
+
+
+def load_gazetteer(path: Optional[str | Path] = None) -> dict[str, dict]:
+    """
+    The offline gazetteer ({normalized address: {"lat", "lon", "display_name"}}), empty if there is none.
+
+    Entries are also listed under their `place_key`, unless another entry already has that key or
+    two entries share it for different places (e.g. towns of the same name in two regions).
+    """
+    global _gazetteer
+    with _gazetteer_lock:
+        if path is not None or _gazetteer is None:
+            path = Path(path or GAZETTEER_PATH)
+            gazetteer = {}
+            if path.exists():
+                with open(path, encoding="utf-8") as f:
+                    gazetteer = {normalize_address(name): place for name, place in json.load(f).items()}
+            aliases = {}
+            for key, place in gazetteer.items():
+                aliases.setdefault(place_key(key), []).append(place)
+            for alias, places in aliases.items():
+                if alias not in gazetteer and len({(place["lat"], place["lon"]) for place in places}) == 1:
+                    gazetteer[alias] = places[0]
+            _gazetteer = gazetteer
+        return _gazetteer
+
+
+def gazetteer_place(address: str, gazetteer: Optional[dict[str, dict]] = None) -> Optional[dict]:
+    """The gazetteer entry of an address, by its full normalized form first and then by `place_key`."""
+    gazetteer = load_gazetteer() if gazetteer is None else gazetteer
+    place = gazetteer.get(normalize_address(address))
+    return place if place is not None else gazetteer.get(place_key(address))
+
+
+def nominatim_search(address: str, details: bool = False) -> Optional[dict]:
+    """
+    First Nominatim result for an address, without caching.
+
+    Requests go through the shared HTTP client, whose limiter keeps Nominatim at one request per second.
+
+    Args:
+        address: Free-form address, e.g. "Nokere, Flanders, Belgium".
+        details: Include the address breakdown (city, town, county...) in the result.
+
+    Returns:
+        dict: The raw Nominatim result, or None when the address is unknown.
+    """
+    params = {"q": address, "format": "json", "limit": 1}
+    if details:
+        params["addressdetails"] = 1
+    response = http_client.get(NOMINATIM_URL, params=params, headers={"User-Agent": USER_AGENT})
+    response.raise_for_status()
+    data = response.json()
+    if not isinstance(data, list):
+        raise ValueError(f"Unexpected Nominatim response: {data}")
+    return data[0] if data else None
+
+
+def cached_lookup(namespace: str, address: str, compute: Callable[[], object]):
+    """
+    Cache the result of any geocoder by normalized address, e.g. `cached_lookup("pelias", ...)`.
+
+    A None result (address not found) is cached for NEGATIVE_TTL. `compute` must raise on transport
+    and API errors instead of returning None, so failures are retried on the next call.
+    """
+    return disk_cache.get_cache("geocode").cached(
+        namespace, normalize_address(address), compute, GEOCODE_TTL, negative_ttl=NEGATIVE_TTL)
+
+
+def geocode_details(address: str) -> Optional[dict]:
+    """Raw Nominatim result with address details, cached on disk."""
+    return cached_lookup("nominatim_details", address, lambda: nominatim_search(address, details=True))
+
+
+def geocode(address: str) -> Optional[tuple[float, float]]:
+    """
+    Coordinates of an address: from the offline gazetteer, else the disk cache, else Nominatim.
+
+    Args:
+        address: Free-form address, e.g. "Nokere, Flanders, Belgium".
+
+    Returns:
+        tuple: (lat, lon), or None when the address is unknown.
+    """
+    place = gazetteer_place(address)
+    if place is None:
+        place = cached_lookup("nominatim", address, lambda: _place(nominatim_search(address)))
+    if place is None:
+        return None
+    return float(place["lat"]), float(place["lon"])
+
+
+def _place(result: Optional[dict]) -> Optional[dict]:
+    if result is None:
+        return None
+    return {"lat": result["lat"], "lon": result["lon"], "display_name": result.get("display_name")}
+
+
+def geocode_many(addresses: Iterable[str], max_workers: int = MAX_GEOCODE_WORKERS) -> dict[str, Optional[tuple[float, float]]]:
+    """
+    Geocode many addresses at once.
+
+    Duplicates (after normalization) are looked up once and known places are answered from the
+    gazetteer or the cache; the rest are fetched concurrently under the shared Nominatim limit.
+    An address whose lookup failed maps to None.
+
+    Returns:
+        dict: Address -> (lat, lon) or None, in the order the addresses were given.
+    """
+    addresses = list(addresses)
+    unique = list(dict.fromkeys(normalize_address(address) for address in addresses))
+
+    def lookup(address):
+        try:
+            return geocode(address)
+        except Exception as e:
+            print(f"Geocoding failed for {address}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as executor:
+        coords = dict(zip(unique, executor.map(lookup, unique)))
+    return {address: coords[normalize_address(address)] for address in addresses}
+
+
+def seed_gazetteer(names: Iterable[str], path: Optional[str | Path] = None, suffix: str = "") -> dict[str, dict]:
+    """
+    Geocode place names once and add them to the offline gazetteer file.
+
+    Args:
+        names: Place names, e.g. the waypoints of map_glossary_ref.json.
+        path: Gazetteer file, defaults to GAZETTEER_PATH.
+        suffix: Appended to every name, e.g. ", Belgium", and part of the gazetteer key.
+
+    Returns:
+        dict: The updated gazetteer.
+    """
+    path = Path(path or GAZETTEER_PATH)
+    gazetteer = {}
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            gazetteer = json.load(f)
+    known = {normalize_address(name) for name in gazetteer}
+    for name in names:
+        address = f"{name}{suffix}"
+        if normalize_address(address) in known:
+            continue
+        place = cached_lookup("nominatim", address, lambda: _place(nominatim_search(address)))
+        if place is None:
+            print(f"Could not geocode {address}")
+            continue
+        gazetteer[address] = place
+        known.add(normalize_address(address))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(gazetteer, f, indent=4, ensure_ascii=False)
+    load_gazetteer(path)
+    return gazetteer
+
+
+def glossary_places(path: str | Path = GLOSSARY_PATH) -> list[str]:
+    """Town names of the route glossary (key waypoints and feed zones)."""
+    with open(path, encoding="utf-8") as f:
+        glossary = json.load(f)
+    return list(dict.fromkeys(name for key in GLOSSARY_PLACE_KEYS for name in glossary.get(key, [])))
+
+
+def parser_setter():
+    parser = argparse.ArgumentParser(description="Seed the offline gazetteer used for geocoding waypoints")
+    parser.add_argument("names", type=str, nargs="*", help="Places to add, defaults to the glossary waypoints")
+    parser.add_argument("--glossary", type=str, default=str(GLOSSARY_PATH), help="Glossary JSON to take places from")
+    parser.add_argument("--suffix", type=str, default=", Belgium", help="Appended to every place name")
+    parser.add_argument("-o", "--output", type=str, default=str(GAZETTEER_PATH), help="Gazetteer file to update")
+    return parser.parse_args()
+
+
+def main():
+    args = parser_setter()
+    names = args.names or glossary_places(args.glossary)
+    gazetteer = seed_gazetteer(names, args.output, args.suffix)
+    print(f"{len(gazetteer)} places in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider is skipped because its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider after `failure_threshold` consecutive failures (e.g. repeated 429s).
+
+    Once open, the breaker rejects calls for `cooldown` seconds, then lets a single trial call
+    through ("half-open"): success closes it again, another failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown: float = 300.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None and time.monotonic() - self._opened_at < self.cooldown
+
+    def allow(self) -> bool:
+        """Whether a call may be made now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f"Circuit breaker for {self.name} opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+
+
+def hedged_call(
+    providers: list[tuple[CircuitBreaker, Callable[[], Any]]],
+    hedge_delay: float,
+) -> Any:
+    """
+    Call providers in order, firing the next one when the previous has not answered within
+    `hedge_delay` seconds (or has failed), and return the first successful answer.
+
+    Providers whose circuit breaker is open are skipped. Slower calls still running when an
+    answer arrives are abandoned, not waited for.
+
+    Args:
+        providers: (breaker, call) pairs, primary first.
+        hedge_delay: Seconds to wait for a provider before also firing the next one.
+
+    Returns:
+        The first successful result.
+
+    Raises:
+        The last provider error, or CircuitOpenError when every provider was skipped.
+    """
+    executor = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="hedge")
+    try:
+        running = {}
+        last_error: BaseException = CircuitOpenError("Every provider is temporarily disabled")
+        next_index = 0
+        launch_next = True
+        while True:
+            if launch_next:
+                # Skip providers whose breaker is open, launch the next available one
+                while next_index < len(providers) and not providers[next_index][0].allow():
+                    next_index += 1
+                if next_index < len(providers):
+                    breaker, func = providers[next_index]
+                    running[executor.submit(_record, breaker, func)] = breaker
+                    next_index += 1
+                    launched_at = time.monotonic()
+            if not running:
+                raise last_error
+
+            timeout = None
+            if next_index < len(providers):
+                timeout = max(0.0, launched_at + hedge_delay - time.monotonic())
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            launch_next = not done  # the hedge delay passed without an answer
+
+            for future in done:
+                running.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+                    launch_next = True
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _record(breaker: CircuitBreaker, func: Callable[[], Any]) -> Any:
+    try:
+        result = func()
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
@@ -0,0 +1,280 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+POOL_HOSTS = 50  # number of per-host keep-alive pools kept open
+POOL_SIZE = 16  # connections kept alive per host
+RETRIES = 2
+BACKOFF_FACTOR = 0.5
+BACKOFF_JITTER = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Requests per second allowed per host, e.g. Nominatim's usage policy is one request per second
+RATE_LIMITS = {
+    "nominatim.openstreetmap.org": 1.0,
+}
+
+
+@dataclass
+class RequestMetrics:
+    """Timings of one request, in seconds. `connect` and `tls` are 0 when a kept-alive connection was reused."""
+    method: str
+    url: str
+    host: str
+    status: Optional[int]
+    connect: float
+    tls: float
+    ttfb: float
+    total: float
+    reused: bool
+    error: Optional[str] = None
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` acquisitions per second, with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Connect/TLS timings of the connections opened by the current thread's in-flight request
+_timings = threading.local()
+# Rate limiter of the current thread's in-flight request, applied to every attempt by the pools
+_limits = threading.local()
+
+
+def _record(name: str, seconds: float) -> None:
+    setattr(_timings, name, getattr(_timings, name, 0.0) + seconds)
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _record("connect", time.perf_counter() - start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _record("connect", time.perf_counter() - start)
+
+    def connect(self):
+        start = time.perf_counter()
+        connect_before = getattr(_timings, "connect", 0.0)
+        try:
+            super().connect()
+        finally:
+            # The TLS handshake is whatever connect() spent beyond opening the TCP socket
+            tcp = getattr(_timings, "connect", 0.0) - connect_before
+            _record("tls", time.perf_counter() - start - tcp)
+
+
+class _RateLimitedPool:
+    """
+    Takes a rate limit token before every attempt. urllib3 retries by calling `urlopen` again from
+    inside the adapter's `send`, so limiting there (not once per `send`) also spaces out retries.
+    """
+
+    def urlopen(self, method, url, *args, **kwargs):
+        limiter = getattr(_limits, "limiter", None)
+        if limiter is not None:
+            limiter.acquire()
+        return super().urlopen(method, url, *args, **kwargs)
+
+
+class _TimedHTTPConnectionPool(_RateLimitedPool, HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(_RateLimitedPool, HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter with timed connections, per-host rate limits and a metrics hook."""
+
+    def __init__(self, client: "HttpClient", **kwargs):
+        self.client = client
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        host = urlparse(request.url).hostname or ""
+        _limits.limiter = self.client.rate_limiter(host)
+
+        _timings.connect = 0.0
+        _timings.tls = 0.0
+        start = time.perf_counter()
+        response = None
+        error = None
+        try:
+            response = super().send(request, **kwargs)
+            return response
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            _limits.limiter = None
+            hook = self.client.metrics_hook
+            if hook is not None:
+                connect, tls = _timings.connect, _timings.tls
+                hook(RequestMetrics(
+                    method=request.method,
+                    url=request.url,
+                    host=host,
+                    status=response.status_code if response is not None else None,
+                    connect=connect,
+                    tls=tls,
+                    ttfb=response.elapsed.total_seconds() if response is not None else 0.0,
+                    total=time.perf_counter() - start,
+                    reused=connect == 0.0,
+                    error=error,
+                ))
+
+
+class HttpClient:
+    """
+    Shared HTTP client: keep-alive connection pools per host, bounded retries with jittered
+    exponential backoff, per-host rate limits and an optional metrics hook.
+
+    Every call runs in a fresh `requests.Session` mounted on one shared adapter, so callers keep
+    getting `requests.Response` objects and `requests` exceptions, and connections are reused across
+    calls while cookies are not: like the bare `requests.get`, cookies set during a call (e.g. on a
+    redirect) are sent for the rest of that call only, and calls in other threads never see them.
+    """
+
+    def __init__(
+        self,
+        rate_limits: Optional[dict[str, float]] = None,
+        retries: int = RETRIES,
+        pool_hosts: int = POOL_HOSTS,
+        pool_size: int = POOL_SIZE,
+        metrics_hook: Optional[Callable[[RequestMetrics], None]] = None,
+    ):
+        self.metrics_hook = metrics_hook
+        self._rate_limits = dict(RATE_LIMITS if rate_limits is None else rate_limits)
+        self._limiters: dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,  # a server that timed out once is slow, retrying only multiplies the wait
+            status=retries,
+            backoff_factor=BACKOFF_FACTOR,
+            backoff_jitter=BACKOFF_JITTER,
+            status_forcelist=RETRY_STATUSES,
+            # Every POST we send is a read-only query (Overpass), so it is safe to retry
+            allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.adapter = PooledAdapter(self, pool_connections=pool_hosts, pool_maxsize=pool_size, max_retries=retry)
+
+    def set_rate_limit(self, host: str, rate: Optional[float]) -> None:
+        """Allow `rate` requests per second to `host`, or remove its limit with None."""
+        with self._lock:
+            self._limiters.pop(host, None)
+            if rate is None:
+                self._rate_limits.pop(host, None)
+            else:
+                self._rate_limits[host] = rate
+
+    def rate_limiter(self, host: str) -> Optional[RateLimiter]:
+        with self._lock:
+            if host not in self._rate_limits:
+                return None
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(self._rate_limits[host])
+            return self._limiters[host]
+
+    def _session(self) -> requests.Session:
+        """A session for one call: its own cookie jar, the shared adapter and connection pools."""
+        session = requests.Session()
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+        # Not closed after the call, closing it would close the shared adapter's pools
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self._session().request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self._session().get(url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self._session().post(url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self._session().head(url, **kwargs)
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Return the client shared by every module."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def set_metrics_hook(hook: Optional[Callable[[RequestMetrics], None]]) -> None:
+    """Report the timings of every request made through the shared client to `hook`."""
+    get_client().metrics_hook = hook
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return get_client().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return get_client().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return get_client().post(url, **kwargs)
+
+
+def head(url: str, **kwargs) -> requests.Response:
+    return get_client().head(url, **kwargs)
@@ -1,16 +1,21 @@
 import osmnx as ox
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
-import time
+import requests
 from dotenv import load_dotenv
 import json
+import re
 import matplotlib.pyplot as plt
-import requests
 import networkx as nx
 import folium
-import math
+import numpy as np
 from itertools import pairwise
 
+from src import geo_distance
+from src import geocoding
+from src import http_client
+from src import road_source
+from src import spatial_index
+from src.tile_cache import TileCacheSource
+
 load_dotenv()
 
 def get_roads(city_name):
@@ -29,12 +34,9 @@ def get_roads(city_name):
     out skel qt;
     """
 
-    url = "http://overpass-api.de/api/interpreter"
-    response = requests.get(url, params={'data': query})
-    data = response.json()
     # Extract road names
     road_names = set()
-    for element in data["elements"]:
+    for element in road_source.cached_query(query):
         if element["type"] == "way" and "tags" in element and "name" in element["tags"]:
             road_names.add(element["tags"]["name"])
 
@@ -55,14 +57,9 @@ def get_city_name(city_name):
     out body;
     """
 
-    # Request Overpass API
-    url = "http://overpass-api.de/api/interpreter"
-    response = requests.get(url, params={'data': query})
-    data = response.json()
-
-    # Extract location names
+    # Extract location names, streamed from the Overpass API (cached on disk by query)
     locations = set()
-    for element in data["elements"]:
+    for element in road_source.cached_query(query):
         if "tags" in element and "name" in element["tags"]:
             locations.add(element["tags"]["name"])
 
@@ -80,7 +77,7 @@ def find_city_pass_through():
     osrm_url = f"http://router.project-osrm.org/route/v1/driving/{start[1]},{start[0]};{finish[1]},{finish[0]}?overview=full&geometries=geojson"
 
     # Request route from OSRM
-    osrm_response = requests.get(osrm_url).json()
+    osrm_response = http_client.get(osrm_url).json()
     coordinates = osrm_response["routes"][0]["geometry"]["coordinates"]
 
     # Get city names from route waypoints
@@ -90,7 +87,7 @@ def find_city_pass_through():
 
     for lon, lat in coordinates[::10]:  # Sample every 10th point to reduce API calls
         params = {"lat": lat, "lon": lon, "format": "json"}
-        nominatim_response = requests.get(nominatim_url, params=params, headers=headers).json()
+        nominatim_response = http_client.get(nominatim_url, params=params, headers=headers).json()
 
         # Extract city, town, or village name
         city = nominatim_response.get("address", {}).get("city") or \
@@ -105,77 +102,63 @@ def find_city_pass_through():
 
 
 def get_lat_lon(city_name, country=None):
-    # Nominatim Forward Geocoding API with optional country filter
+    # Forward geocoding (gazetteer, disk cache, then Nominatim) with optional country filter
     if country:
         query = f"{city_name}, {country}"
     else:
         query = city_name
 
-    url = f"https://nominatim.openstreetmap.org/search?q={query}&format=json&limit=1"
-
-    # Send the request
-    response = requests.get(url, headers={'User-Agent': 'your-app-name'})
-    data = response.json()
-
-    # Extract latitude and longitude from the response
-    if data:
-        lat = data[0]["lat"]
-        lon = data[0]["lon"]
-        return float(lat), float(lon)
+    coords = geocoding.geocode(query)
+    if coords:
+        return coords
     else:
         return None, None
 
 
 def get_location_details(address):
-    geolocator = Nominatim(user_agent="location_finder")
-
-    # Add a delay to respect usage limits
-    time.sleep(1)
-
+    # Cached, and rate limited to Nominatim's usage policy by the shared client
     try:
-        # Get location
-        location = geolocator.geocode(address, addressdetails=True)
-
-        if location:
-            # Extract components from the raw response
-            address_components = location.raw.get('address', {})
-
-            # Extract different administrative levels
-            city = address_components.get('city')
-            town = address_components.get('town')
-            village = address_components.get('village')
-            suburb = address_components.get('suburb')
-            neighborhood = address_components.get('neighbourhood')  # Note the British spelling
-            county = address_components.get('county')
-            state = address_components.get('state')
-            country = address_components.get('country')
-
-            print(f"Full address: {location.address}")
-            print(f"Coordinates: {location.latitude}, {location.longitude}")
-
-            # Print available components
-            for component_type, value in {
-                'City': city,
-                'Town': town,
-                'Village': village,
-                'Suburb': suburb,
-                'Neighborhood': neighborhood,
-                'County': county,
-                'State': state,
-                'Country': country
-            }.items():
-                if value:
-                    print(f"{component_type}: {value}")
-
-            return location.raw
-        else:
-            print("Location not found")
-            return None
-
-    except (GeocoderTimedOut, GeocoderServiceError) as e:
+        location = geocoding.geocode_details(address)
+    except (requests.RequestException, ValueError) as e:
         print(f"Error: {e}")
         return None
 
+    if location:
+        # Extract components from the raw response
+        address_components = location.get('address', {})
+
+        # Extract different administrative levels
+        city = address_components.get('city')
+        town = address_components.get('town')
+        village = address_components.get('village')
+        suburb = address_components.get('suburb')
+        neighborhood = address_components.get('neighbourhood')  # Note the British spelling
+        county = address_components.get('county')
+        state = address_components.get('state')
+        country = address_components.get('country')
+
+        print(f"Full address: {location.get('display_name')}")
+        print(f"Coordinates: {location['lat']}, {location['lon']}")
+
+        # Print available components
+        for component_type, value in {
+            'City': city,
+            'Town': town,
+            'Village': village,
+            'Suburb': suburb,
+            'Neighborhood': neighborhood,
+            'County': county,
+            'State': state,
+            'Country': country
+        }.items():
+            if value:
+                print(f"{component_type}: {value}")
+
+        return location
+    else:
+        print("Location not found")
+        return None
+
 
 def get_all_main_roads_between(city1, city2):
     # Get the street networks for both cities
@@ -200,13 +183,7 @@ def get_all_main_roads_between(city1, city2):
     return G_main
 
 def get_city_coords(city_name):
-    url = f"https://nominatim.openstreetmap.org/search?q={city_name}&format=json&limit=1"
-    headers = {'User-Agent': 'MainRoadFinder/1.0'}
-    response = requests.get(url, headers=headers)
-    data = response.json()
-    if data:
-        return float(data[0]['lat']), float(data[0]['lon'])
-    return None
+    return geocoding.geocode(city_name)
 
 def raw():
     city1_name = "Deinze, Belgium"
@@ -237,9 +214,6 @@ def raw():
             out geom;
             """
 
-    response = requests.post(overpass_url, data=query)
-    data = response.json()
-
     # Create a map centered between the two cities
     center_lat = (lat1 + lat2) / 2
     center_lon = (lon1 + lon2) / 2
@@ -249,7 +223,7 @@ def raw():
     folium.Marker([lat1, lon1], popup=city1_name).add_to(m)
     folium.Marker([lat2, lon2], popup=city2_name).add_to(m)
     road_names = []
-    for way in data['elements']:
+    for way in road_source.cached_query(query, overpass_url):
         if 'geometry' in way:
             points = [(node['lat'], node['lon']) for node in way['geometry']]
 
@@ -351,12 +325,10 @@ def get_road_names(city_names: list[str]) -> list[str]:
             out geom;
             """
     print(query)
-    response = requests.post(overpass_url, data=query)
-    data = response.json()
     road_names = []
     road_names_no_ref = []
-    print(data)
-    for way in data['elements']:
+    # Ways are handled as the response streams in, the whole response is never held in memory
+    for way in road_source.cached_query(query, overpass_url):
         if 'geometry' in way:
             points = [(node['lat'], node['lon']) for node in way['geometry']]
 
@@ -383,9 +355,6 @@ def get_road_names(city_names: list[str]) -> list[str]:
             ).add_to(m)
     m.save('main_roads_map.html')
     print(road_names)
-    data
-    with open('data_streetmao.json', 'w+') as file:
-        json.dump(data, file, indent=4)
 
     with open('main_roads_map.json', 'w+') as file:
         json.dump(road_names, file, indent=4)
@@ -520,7 +489,7 @@ def get_multi_waypoint_route(waypoints, max_routes_per_segment=3):
     # </div>
     # """
     # m.get_root().html.add_child(folium.Element(legend_html))
-    all_road = [road for road in list(set(all_road)) if not road.startswith("way_")]
+    all_road = [road for road in dict.fromkeys(all_road) if not road.startswith("way_")]
     return {
         "map": m,
         "segments": all_segments,
@@ -529,9 +498,17 @@ def get_multi_waypoint_route(waypoints, max_routes_per_segment=3):
     }
 
 
-def get_segment_route(start_point, end_point, max_routes=3):
+def path_road_names(G, path):
+    """Names of the roads along a path, in order of first appearance (ordered dedupe, no list scans)"""
+    names = (G[u][v].get('name') for u, v in pairwise(path) if G.has_edge(u, v))
+    return [name for name in dict.fromkeys(names) if name]
+
+
+def get_segment_route(start_point, end_point, max_routes=3, roads=None):
     """
     Get possible routes for a single segment using Overpass API and NetworkX
+
+    `roads` is the road source to use (see `road_source`), Overpass through the tile cache by default.
     """
     # Create a bounding box around the points with some padding
     min_lat = min(start_point[0], end_point[0]) - 0.05
@@ -539,38 +516,25 @@ def get_segment_route(start_point, end_point, max_routes=3):
     min_lon = min(start_point[1], end_point[1]) - 0.05
     max_lon = max(start_point[1], end_point[1]) + 0.05
 
-    # Query for roads in this area
-    overpass_url = "https://overpass-api.de/api/interpreter"
-    condition_highway = """motorway|trunk|primary|secondary|tertiary|unclassified|residential"""
-    query = f"""
-    [out:json];
-    (
-      way["highway"~"motorway|trunk|primary|secondary|tertiary"]
-        ({min_lat},{min_lon},{max_lat},{max_lon});
-    );
-    (._;>;);  // Get all nodes for ways
-    out body;
-    """
-
-    response = requests.post(overpass_url, data=query)
-    data = response.json()
+    # Query for roads in this area, assembled from the on-disk tile cache where possible
+    roads = roads if roads is not None else TileCacheSource(road_source.OverpassSource())
+    elements = roads.elements((min_lat, min_lon, max_lat, max_lon))
+    main_road = re.compile("motorway|trunk|primary|secondary|tertiary")
 
     # Create a graph from the data
     G = nx.DiGraph()  # Directed graph for one-way roads
 
-    # Process nodes
-    nodes = {}
-    for element in data['elements']:
+    # Process nodes and ways (roads) in a single pass, collecting the edges of every way
+    all_nodes = {}
+    way_edges = []
+    for element in elements:
         if element['type'] == 'node':
-            node_id = element['id']
-            nodes[node_id] = (element['lat'], element['lon'])
-            G.add_node(node_id, pos=(element['lat'], element['lon']))
-
-    # Process ways (roads)
-    for element in data['elements']:
-        if element['type'] == 'way' and 'tags' in element and 'highway' in element['tags']:
+            all_nodes[element['id']] = (element['lat'], element['lon'])
+        elif element['type'] == 'way' and 'tags' in element and 'highway' in element['tags']:
             way_id = element['id']
             highway_type = element['tags']['highway']
+            if not main_road.search(highway_type):
+                continue
             name = element['tags'].get('name', f"way_{way_id}")
 
             # Set edge weight based on road type
@@ -584,34 +548,45 @@ def get_segment_route(start_point, end_point, max_routes=3):
                 'residential': 1.3  # Slow
             }
             weight_factor = weight_factors.get(highway_type, 1.0)
+            oneway = element['tags'].get('oneway', 'no')
 
             # Process nodes in the way
-            for i in range(len(element['nodes']) - 1):
-                from_node = element['nodes'][i]
-                to_node = element['nodes'][i + 1]
-
-                if from_node in nodes and to_node in nodes:
-                    # Calculate distance between nodes
-                    from_pos = nodes[from_node]
-                    to_pos = nodes[to_node]
-                    distance = haversine_distance(from_pos[0], from_pos[1], to_pos[0], to_pos[1])
-
-                    # Adjusted distance based on road type
-                    weighted_distance = distance * weight_factor
-
-                    # Add edge to graph
-                    G.add_edge(from_node, to_node,
-                               weight=weighted_distance,
-                               highway=highway_type,
-                               name=name)
-
-                    # Handle one-way streets
-                    oneway = element['tags'].get('oneway', 'no')
-                    if oneway != 'yes':
-                        G.add_edge(to_node, from_node,
-                                   weight=weighted_distance,
-                                   highway=highway_type,
-                                   name=name)
+            for from_node, to_node in pairwise(element['nodes']):
+                way_edges.append((from_node, to_node, weight_factor, highway_type, name, oneway))
+
+    # Nodes may come after the ways that use them, so drop edges to unknown nodes only now
+    edges = [edge for edge in way_edges if edge[0] in all_nodes and edge[1] in all_nodes]
+
+    # Only the nodes of the kept (main road) ways, so start and end never snap to a side street node
+    # without edges: the road data also holds residential and unclassified ways
+    nodes = {node_id: all_nodes[node_id] for edge in edges for node_id in edge[:2]}
+    for node_id, pos in nodes.items():
+        G.add_node(node_id, pos=pos)
+
+    # Calculate the distances between the nodes of all edges at once
+    if edges:
+        from_pos = np.array([nodes[edge[0]] for edge in edges])
+        to_pos = np.array([nodes[edge[1]] for edge in edges])
+        edge_distances = geo_distance.haversine(from_pos[:, 0], from_pos[:, 1], to_pos[:, 0], to_pos[:, 1]).tolist()
+    else:
+        edge_distances = []
+
+    for (from_node, to_node, weight_factor, highway_type, name, oneway), distance in zip(edges, edge_distances):
+        # Adjusted distance based on road type
+        weighted_distance = distance * weight_factor
+
+        # Add edge to graph
+        G.add_edge(from_node, to_node,
+                   weight=weighted_distance,
+                   highway=highway_type,
+                   name=name)
+
+        # Handle one-way streets
+        if oneway != 'yes':
+            G.add_edge(to_node, from_node,
+                       weight=weighted_distance,
+                       highway=highway_type,
+                       name=name)
 
     # Find the nearest graph nodes to our start and end points
     start_node = find_nearest_node(G, start_point, nodes)
@@ -636,19 +611,11 @@ def get_segment_route(start_point, end_point, max_routes=3):
         segment_points.append(route_points)
 
         # Calculate route distance
-        distance = sum(haversine_distance(route_points[j][0], route_points[j][1],
-                                          route_points[j + 1][0], route_points[j + 1][1])
-                       for j in range(len(route_points) - 1))
+        distance = geo_distance.polyline_length(route_points)
         distances.append(distance)
 
         # Get road names along the route
-        road_names = []
-        for j in range(len(shortest_path) - 1):
-            if G.has_edge(shortest_path[j], shortest_path[j + 1]):
-                road_name = G[shortest_path[j]][shortest_path[j + 1]].get('name')
-                if road_name and road_name not in road_names:
-                    road_names.append(road_name)
-        all_road_names.append(road_names)
+        all_road_names.append(path_road_names(G, shortest_path))
 
         # Create a copy of the graph for alternative routes
         G_alt = G.copy()
@@ -681,13 +648,7 @@ def get_segment_route(start_point, end_point, max_routes=3):
                         distances.append(alt_distance)
 
                         # Get road names along the route
-                        alt_road_names = []
-                        for j in range(len(alt_path) - 1):
-                            if G.has_edge(alt_path[j], alt_path[j + 1]):
-                                road_name = G[alt_path[j]][alt_path[j + 1]].get('name')
-                                if road_name and road_name not in alt_road_names:
-                                    alt_road_names.append(road_name)
-                        all_road_names.append(alt_road_names)
+                        all_road_names.append(path_road_names(G, alt_path))
 
                         # Also penalize this path for future alternatives
                         for j in range(len(alt_path) - 1):
@@ -702,36 +663,20 @@ def get_segment_route(start_point, end_point, max_routes=3):
         "routes": routes,
         "segment_points": segment_points,
         "distances": distances,
-        "road_names": all_road_names
+        "road_names": all_road_names,
+        "node_count": G.number_of_nodes(),
+        "edge_count": G.number_of_edges(),
     }
 
 
 def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate the distance between two points on earth"""
-    # Convert to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-
-    # Haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
-    c = 2 * math.asin(math.sqrt(a))
-    r = 6371  # Earth radius in kilometers
-    return c * r
+    """Calculate the distance between two points on earth, in km (see `geo_distance` for arrays)"""
+    return float(geo_distance.haversine(lat1, lon1, lat2, lon2))
 
 
 def find_nearest_node(G, point, nodes):
-    """Find the node in the graph closest to the given point"""
-    min_dist = float('inf')
-    nearest_node = None
-
-    for node_id, node_pos in nodes.items():
-        dist = haversine_distance(point[0], point[1], node_pos[0], node_pos[1])
-        if dist < min_dist:
-            min_dist = dist
-            nearest_node = node_id
-
-    return nearest_node
+    """Find the node in the graph closest to the given point, using a spatial index built once per graph"""
+    return spatial_index.nearest_node(G, point, nodes)
 
 
 def is_different_route(route1, route2, threshold=0.7):
@@ -1,24 +1,39 @@
 import argparse
-import math
 import os
+import time
 from itertools import pairwise
 from typing import Dict, List, Optional, Iterable
 
-import folium
-import networkx as nx
 import openrouteservice
 import osmnx as ox
-import requests
 from dotenv import load_dotenv
 from geopy.geocoders import Nominatim
 from openrouteservice import exceptions
 import json
 
+from src import geo_distance
+from src import geocoding
+from src import http_client
+from src import road_source
+from src import route_render
+from src import segment_routing
+from src import spatial_index
+from src.races import RACES
+from src.road_graph import RoadGraph
+from src.route_store import RouteStore
+
 load_dotenv()
 
 
 class MapUtility:
-    def __init__(self):
+    def __init__(self, roads=None, route_store: Optional[RouteStore] = None):
+        """
+        Args:
+            roads: Where segment routing gets its road data (see `road_source`), defaults to the
+                local extract named by OSM_EXTRACT_PATH with Overpass as fallback.
+            route_store: Graphs and routed segments kept between calls, so a waypoint list that
+                changes one town only recomputes the two segments around it. Defaults to a new store.
+        """
         self.locations = []
         self.__api_key = ""
 
@@ -26,6 +41,8 @@ class MapUtility:
         self.__initial_key()
         self.cclient = openrouteservice.Client(key=self.__api_key)
         self._visualize = False
+        self.roads = roads if roads is not None else road_source.default_source()
+        self.route_store = route_store if route_store is not None else RouteStore()
 
     def set_location(self, locations: List[str]):
         """Set the location for geocoding."""
@@ -38,9 +55,28 @@ class MapUtility:
 
     @visualize.setter
     def visualize(self, visualize: bool):
-        """Set whether to visualize the route on a map."""
+        """Set whether to visualize the route on a map (routing results then include a folium map)."""
         self._visualize = visualize
 
+    @staticmethod
+    def render_route(result: dict, fmt: str = "folium", tolerance_m: float = route_render.SIMPLIFY_TOLERANCE_M):
+        """
+        Render a `get_multi_waypoint_route` result after the fact.
+
+        Args:
+            result: The routing result.
+            fmt: "folium" for a folium.Map, "geojson" for a GeoJSON FeatureCollection dict,
+                "polyline" or "float32" for a compact result (see `route_render.compact_result`).
+            tolerance_m: Route simplification tolerance in metres, 0 keeps every node.
+        """
+        if fmt == "folium":
+            return route_render.render_folium(result, tolerance_m)
+        if fmt == "geojson":
+            return route_render.to_geojson(result, tolerance_m=tolerance_m)
+        if fmt in ("polyline", "float32"):
+            return route_render.compact_result(result, tolerance_m, fmt)
+        raise ValueError(f"Unknown map format: {fmt}")
+
 
     def __initial_key(self):
         if not os.getenv("OPENROUTESERVICE_API_KEY"):
@@ -50,15 +86,21 @@ class MapUtility:
 
     @staticmethod
     def geocode_location(client, address: str) -> Optional[List[float]]:
-        """Geocode an address to coordinates using OpenRouteService."""
-        try:
+        """Geocode an address to coordinates using OpenRouteService, cached by normalized address."""
+        def search():
             geocode_result = client.pelias_search(text=address, size=1)
-            if geocode_result and 'features' in geocode_result and len(geocode_result['features']) > 0:
-                coordinates = geocode_result['features'][0]['geometry']['coordinates']
-                return coordinates
-            else:
+            # Only an empty result is "not found" and cached as such, anything else malformed is an error
+            if not isinstance(geocode_result, dict) or 'features' not in geocode_result:
+                raise ValueError(f"Unexpected geocoding response: {geocode_result}")
+            if geocode_result['features']:
+                return geocode_result['features'][0]['geometry']['coordinates']
+            return None
+
+        try:
+            coordinates = geocoding.cached_lookup("pelias", address, search)
+            if coordinates is None:
                 print(f"Warning: Could not geocode address: {address}")
-                return None
+            return coordinates
         except exceptions.ApiError as e:
             print(f"Geocoding API Error: {e}")
             return None
@@ -143,6 +185,8 @@ class MapUtility:
 
     @staticmethod
     def visualize_map(directions, locations, coordinates):
+        import folium
+
         route = directions['features'][0]['geometry']['coordinates']
         m = folium.Map(location=[coordinates[0][1], coordinates[0][0]], zoom_start=12)
         # color marker
@@ -201,61 +245,84 @@ class MapUtility:
             print(f"An error occurred: {e}")
             return list()
 
-    def get_multi_waypoint_route(self, waypoints: list[(int, int)], max_routes_per_segment: int=3) -> dict | str:
+    def get_multi_waypoint_route(self, waypoints: list[(int, int)], max_routes_per_segment: int=3,
+                                 parallel: bool = False, max_workers: Optional[int] = None,
+                                 corridor: bool = False) -> dict | str:
         """
-        Route through multiple waypoints in order using Overpass API and NetworkX
+        Route through multiple waypoints in order using the road source and a CSR road graph
 
         Args:
             waypoints: List of (lat, lon) tuples representing points to visit in order
             max_routes_per_segment: Max number of alternative routes per segment
+            parallel: Fetch and route all segments concurrently (threads for the road data, processes
+                for the graph search), so the whole race takes about as long as its slowest segment
+            max_workers: Number of routing processes in parallel mode, defaults to the number of CPUs
+            corridor: Fetch the roads of the whole race once and route every segment on one shared
+                graph, instead of one overlapping download and graph per segment
+
+        Segments already routed by this MapUtility (same endpoints and max_routes_per_segment) are
+        taken from `route_store`, in every mode; only the remaining ones are fetched and routed.
 
         Returns:
             {
-            "map": m,
+            "map": m (a folium map when `visualize` is set, else None; see `render_route`),
+            "waypoints": waypoints,
             "segments": all_segments,
             "total_distance": total_distance,
             "total_road_names": all_road,
+            "road_distances": road_km,
         }
+        `total_road_names` lists the named roads of all routes in riding order, each once;
+        `road_distances` maps every named road of the primary routes to the km ridden on it.
         """
         if len(waypoints) < 2:
             return "Need at least two waypoints"
 
-        # Create a map centered on the average of all waypoints
-        center_lat = sum(wp[0] for wp in waypoints) / len(waypoints)
-        center_lon = sum(wp[1] for wp in waypoints) / len(waypoints)
-        m = folium.Map(location=[center_lat, center_lon], zoom_start=10)
-
-        # Add markers for all waypoints
-        colors = ['green', 'cadetblue', 'orange', 'purple', 'darkpurple', 'red']
-        for i, point in enumerate(waypoints):
-            if i == 0:
-                marker_text = "Start"
-                color = "green"
-            elif i == len(waypoints) - 1:
-                marker_text = "End"
-                color = "red"
-            else:
-                marker_text = f"Waypoint {i}"
-                color = "cadetblue" or colors[min(i, len(colors) - 1)]
-
-            folium.Marker(
-                point,
-                popup=marker_text,
-                icon=folium.Icon(color=color)
-            ).add_to(m)
-
         # Process each segment between consecutive waypoints
         total_distance = 0
         all_segments = []
         all_road = []
+        road_km = {}
+
+        started = time.perf_counter()
+        segments = list(pairwise(waypoints))
+        # Segments routed by an earlier call are reused, only the others are computed
+        segment_results = []
+        for start_point, end_point in segments:
+            stored = self.route_store.get_result(start_point, end_point, max_routes_per_segment)
+            segment_results.append(None if stored is None else (stored, {"fetch": 0.0, "route": 0.0, "total": 0.0}))
+        missing = [i for i, routed in enumerate(segment_results) if routed is None]
+        missing_segments = [segments[i] for i in missing]
+        print(f"Routing {len(missing)} of {len(segments)} segments, {len(segments) - len(missing)} reused")
+
+        if not missing:
+            routed = []
+        elif corridor:
+            graph = segment_routing.build_corridor_graph(self.roads, waypoints, segments=missing_segments)
+            routed = segment_routing.route_corridor(
+                graph, waypoints, max_routes_per_segment, max_workers, processes=parallel, segments=missing_segments)
+        elif parallel:
+            routed = segment_routing.route_segments_parallel(
+                self.roads, waypoints, max_routes_per_segment, max_workers, segments=missing_segments)
+        else:
+            routed = [self._route_segment(start_point, end_point, max_routes_per_segment)
+                      for start_point, end_point in missing_segments]
+        for i, (result, timings) in zip(missing, routed):
+            segment_results[i] = (result, timings)
+            if not isinstance(result, str):
+                self.route_store.put_result(*segments[i], max_routes_per_segment, result)
 
         # Get pairs of waypoints (start->wp1, wp1->wp2, etc.)
-        for i, (start_point, end_point) in enumerate(pairwise(waypoints)):
+        for i, (start_point, end_point) in enumerate(segments):
             print(f"\nRouting from waypoint {i} to waypoint {i + 1}:")
             print(f"  {start_point} -> {end_point}")
 
-            # Get routes for this segment
-            result = self.get_segment_route(start_point, end_point, max_routes_per_segment)
+            result, timings = segment_results[i]
+            reused = i not in missing
+            if reused:
+                print("  Reused from an earlier call")
+            else:
+                print(f"  Fetched in {timings['fetch']:.2f}s, routed in {timings['route']:.2f}s")
 
             if isinstance(result, str):  # Error message
                 print(f"Error: {result}")
@@ -266,25 +333,23 @@ class MapUtility:
                 "routes": [],
                 "total_routes": len(result["routes"]),
                 "best_route_index": 0,  # Default to first route as best
-                "best_distance": float('inf')
+                "best_distance": float('inf'),
+                "timings": timings,
+                "reused": reused,
+                "index": i,
             }
 
-            # Route colors alternating by segment
-            segment_base_colors = ["blue", "purple"]
-            segment_base_color = segment_base_colors[i % len(segment_base_colors)]
-
-            # Alternative route color variants
-            if segment_base_color == "blue":
-                route_colors = ["blue", "darkblue"]
-            else:
-                route_colors = ["purple", "violet"]
-
-            # Add all alternative routes to the map
+            # Collect all alternative routes
             for j, route_path in enumerate(result["routes"]):
                 route_points = result["segment_points"][j]
                 route_distance = result["distances"][j]
                 road_names = result["road_names"][j]
+                road_runs = result["road_runs"][j]
                 all_road.extend(road_names)
+                if j == 0:
+                    for run in road_runs:
+                        if not run["name"].startswith("way_"):
+                            road_km[run["name"]] = road_km.get(run["name"], 0.0) + run["length"]
 
                 # Track the best (shortest) route
                 if route_distance < segment_data["best_distance"]:
@@ -296,24 +361,10 @@ class MapUtility:
                     "path": route_path,
                     "points": route_points,
                     "distance": route_distance,
-                    "road_names": road_names
+                    "road_names": road_names,
+                    "road_runs": road_runs,
                 })
 
-                # Add this route to the map with varying opacity
-                # Primary route (shortest) is more opaque
-                opacity = 0.9 if j == 0 else 0.6
-                weight = 5 if j == 0 else 3
-
-                route_color = route_colors[min(j, len(route_colors) - 1)]
-
-                folium.PolyLine(
-                    route_points,
-                    color=route_color,
-                    weight=weight,
-                    opacity=opacity,
-                    popup=f"Segment {i + 1}, Route {j + 1}: {route_distance:.1f}km"
-                ).add_to(m)
-
                 print(f"  Route {j + 1}: {route_distance:.1f}km")
                 print(f"  Roads: {', '.join(road_names[:5])}{'...' if len(road_names) > 5 else ''}")
 
@@ -325,6 +376,7 @@ class MapUtility:
             total_distance += primary_route["distance"]
 
         print(f"\nTotal primary route distance: {total_distance:.1f}km")
+        print(f"Routed {len(waypoints) - 1} segments in {time.perf_counter() - started:.2f}s ({self.route_store})")
 
         # Add a legend
         # legend_html = """
@@ -335,17 +387,24 @@ class MapUtility:
         # </div>
         # """
         # m.get_root().html.add_child(folium.Element(legend_html))
-        all_road = [road for road in list(set(all_road)) if not road.startswith("way_")]
-        return {
-            "map": m,
+        # Ordered dedupe, so the names read in the order the race meets them
+        all_road = [road for road in dict.fromkeys(all_road) if not road.startswith("way_")]
+        result = {
+            "map": None,
+            "waypoints": [tuple(point) for point in waypoints],
             "segments": all_segments,
             "total_distance": total_distance,
             "total_road_names": all_road,
+            "road_distances": road_km,
         }
+        # Rendering is a separate stage, skipped entirely by headless callers
+        if self.visualize:
+            result["map"] = route_render.render_folium(result)
+        return result
 
     def get_segment_route(self, start_point: list | tuple, end_point: list | tuple, max_routes: int = 3) -> dict | str:
         """
-        Get possible routes for a single segment using Overpass API and NetworkX
+        Get possible routes for a single segment using the road source (local extract or Overpass API) and a CSR road graph
         Args:
             start_point: Starting point (latitude, longitude)
             end_point: Ending point (latitude, longitude)
@@ -355,194 +414,36 @@ class MapUtility:
             "routes": routes,
             "segment_points": segment_points,
             "distances": distances,
-            "road_names": all_road_names
+            "road_names": all_road_names,
+            "road_runs": road_runs
         }
         """
-        # Create a bounding box around the points with some padding
-        min_lat = min(start_point[0], end_point[0]) - 0.05
-        max_lat = max(start_point[0], end_point[0]) + 0.05
-        min_lon = min(start_point[1], end_point[1]) - 0.05
-        max_lon = max(start_point[1], end_point[1]) + 0.05
-
-        # Query for roads in this area
-        overpass_url = "https://overpass-api.de/api/interpreter"
-        condition_highway = """motorway|trunk|primary|secondary|tertiary|unclassified"""
-        query = f"""
-        [out:json];
-        (
-          way["highway"~"motorway|trunk|primary|secondary|tertiary|unclassified|residential"]
-            ({min_lat},{min_lon},{max_lat},{max_lon});
-        );
-        (._;>;);  // Get all nodes for ways
-        out body;
-        """
-
-        response = requests.post(overpass_url, data=query)
-        data = response.json()
-
-        # Create a graph from the data
-        G = nx.DiGraph()  # Directed graph for one-way roads
-
-        # Process nodes
-        nodes = {}
-        for element in data['elements']:
-            if element['type'] == 'node':
-                node_id = element['id']
-                nodes[node_id] = (element['lat'], element['lon'])
-                G.add_node(node_id, pos=(element['lat'], element['lon']))
-
-        # Process ways (roads)
-        for element in data['elements']:
-            if element['type'] == 'way' and 'tags' in element and 'highway' in element['tags']:
-                way_id = element['id']
-                highway_type = element['tags']['highway']
-                name = element['tags'].get('name', f"way_{way_id}")
-
-                # Set edge weight based on road type
-                weight_factors = {
-                    'motorway': 0.7,  # Fast
-                    'trunk': 0.8,
-                    'primary': 0.9,
-                    'secondary': 1.0,  # Normal
-                    'tertiary': 1.1,
-                    'unclassified': 1.2,
-                    'residential': 1.3  # Slow
-                }
-                weight_factor = weight_factors.get(highway_type, 1.0)
-
-                # Process nodes in the way
-                for i in range(len(element['nodes']) - 1):
-                    from_node = element['nodes'][i]
-                    to_node = element['nodes'][i + 1]
-
-                    if from_node in nodes and to_node in nodes:
-                        # Calculate distance between nodes
-                        from_pos = nodes[from_node]
-                        to_pos = nodes[to_node]
-                        distance = self.haversine_distance(from_pos[0], from_pos[1], to_pos[0], to_pos[1])
-
-                        # Adjusted distance based on road type
-                        weighted_distance = distance * weight_factor
-
-                        # Add edge to graph
-                        G.add_edge(from_node, to_node,
-                                   weight=weighted_distance,
-                                   highway=highway_type,
-                                   name=name)
-
-                        # Handle one-way streets
-                        oneway = element['tags'].get('oneway', 'no')
-                        if oneway != 'yes':
-                            G.add_edge(to_node, from_node,
-                                       weight=weighted_distance,
-                                       highway=highway_type,
-                                       name=name)
-
-        # Find the nearest graph nodes to our start and end points
-        start_node = self.find_nearest_node(G, start_point, nodes)
-        end_node = self.find_nearest_node(G, end_point, nodes)
-
-        if not start_node or not end_node:
-            return "Could not find suitable start/end nodes in the graph"
-
-        # Find multiple routes
-        routes = []
-        segment_points = []
-        distances = []
-        all_road_names = []
-
-        try:
-            # Find shortest path
-            shortest_path = nx.shortest_path(G, start_node, end_node, weight='weight')
-            routes.append(shortest_path)
-
-            # Get the points for this route
-            route_points = [nodes[node_id] for node_id in shortest_path]
-            segment_points.append(route_points)
-
-            # Calculate route distance
-            distance = sum(self.haversine_distance(route_points[j][0], route_points[j][1],
-                                              route_points[j + 1][0], route_points[j + 1][1])
-                           for j in range(len(route_points) - 1))
-            distances.append(distance)
-
-            # Get road names along the route
-            road_names = []
-            for j in range(len(shortest_path) - 1):
-                if G.has_edge(shortest_path[j], shortest_path[j + 1]):
-                    road_name = G[shortest_path[j]][shortest_path[j + 1]].get('name')
-                    if road_name and road_name not in road_names:
-                        road_names.append(road_name)
-            all_road_names.append(road_names)
-
-            # Create a copy of the graph for alternative routes
-            G_alt = G.copy()
-
-            # Find alternative paths if requested
-            if max_routes > 1:
-                for i in range(1, max_routes):
-                    # Increase weights on the shortest path to encourage different routes
-                    for j in range(len(shortest_path) - 1):
-                        if G_alt.has_edge(shortest_path[j], shortest_path[j + 1]):
-                            G_alt[shortest_path[j]][shortest_path[j + 1]]['weight'] *= 2.0
-
-                    # Find new shortest path
-                    try:
-                        alt_path = nx.shortest_path(G_alt, start_node, end_node, weight='weight')
-                        # Only add if it's sufficiently different
-                        if self.is_different_route(routes[0], alt_path, threshold=0.5):
-                            routes.append(alt_path)
-
-                            # Get the points for this route
-                            alt_route_points = [nodes[node_id] for node_id in alt_path]
-                            segment_points.append(alt_route_points)
-
-                            # Calculate route distance using original distances
-                            alt_distance = 0
-                            for j in range(len(alt_path) - 1):
-                                if G.has_edge(alt_path[j], alt_path[j + 1]):
-                                    # Use original graph weights, not the penalized ones
-                                    alt_distance += G[alt_path[j]][alt_path[j + 1]]['weight']
-                            distances.append(alt_distance)
-
-                            # Get road names along the route
-                            alt_road_names = []
-                            for j in range(len(alt_path) - 1):
-                                if G.has_edge(alt_path[j], alt_path[j + 1]):
-                                    road_name = G[alt_path[j]][alt_path[j + 1]].get('name')
-                                    if road_name and road_name not in alt_road_names:
-                                        alt_road_names.append(road_name)
-                            all_road_names.append(alt_road_names)
-
-                            # Also penalize this path for future alternatives
-                            for j in range(len(alt_path) - 1):
-                                if G_alt.has_edge(alt_path[j], alt_path[j + 1]):
-                                    G_alt[alt_path[j]][alt_path[j + 1]]['weight'] *= 1.5
-                    except nx.NetworkXNoPath:
-                        break
-        except nx.NetworkXNoPath:
-            return "No route found between the specified points"
-
-        return {
-            "routes": routes,
-            "segment_points": segment_points,
-            "distances": distances,
-            "road_names": all_road_names
-        }
+        result, _ = self._route_segment(start_point, end_point, max_routes)
+        return result
+
+    def _route_segment(self, start_point, end_point, max_routes: int) -> tuple[dict | str, dict]:
+        """Route one segment on its stored graph, or fetch its roads and build one; returns (result, timings)."""
+        fetch_start = time.perf_counter()
+        graph = self.route_store.get_graph(start_point, end_point)
+        if graph is None:
+            # Roads in a bounding box around the points, from the local extract when it covers it.
+            # Streamed into the graph builder, so "fetch" includes building the graph.
+            bbox = segment_routing.segment_bbox(start_point, end_point)
+            graph = RoadGraph.from_elements(road_source.iter_elements(self.roads, [bbox]))
+            route_start = time.perf_counter()
+        else:
+            route_start = time.perf_counter()
+        result = segment_routing.route_on_graph(graph, start_point, end_point, max_routes)
+        # Stored after routing, so its size includes the spatial index and reverse graph built on the way
+        self.route_store.put_graph(start_point, end_point, graph)
+        timings = {"fetch": route_start - fetch_start, "route": time.perf_counter() - route_start}
+        timings["total"] = timings["fetch"] + timings["route"]
+        return result, timings
 
     @staticmethod
     def haversine_distance(lat1, lon1, lat2, lon2):
-        """Calculate the distance between two points on earth"""
-        # Convert to radians
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-
-        # Haversine formula
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
-        c = 2 * math.asin(math.sqrt(a))
-        r = 6371  # Earth radius in kilometers
-        return c * r
+        """Calculate the distance between two points on earth, in km (see `geo_distance` for arrays)"""
+        return float(geo_distance.haversine(lat1, lon1, lat2, lon2))
 
 
     @staticmethod
@@ -554,27 +455,22 @@ class MapUtility:
 
 
     def find_nearest_node(self, G, point, nodes):
-        """Find the node in the graph closest to the given point"""
-        min_dist = float('inf')
-        nearest_node = None
-
-        for node_id, node_pos in nodes.items():
-            dist = self.haversine_distance(point[0], point[1], node_pos[0], node_pos[1])
-            if dist < min_dist:
-                min_dist = dist
-                nearest_node = node_id
-
-        return nearest_node
+        """Find the node in the graph closest to the given point, using a spatial index built once per graph"""
+        if isinstance(G, RoadGraph):
+            index = G.nearest_node(point)
+            return None if index is None else int(G.node_ids[index])
+        return spatial_index.nearest_node(G, point, nodes)
 
     @staticmethod
     def get_city_coords(city_name):
-        url = f"https://nominatim.openstreetmap.org/search?q={city_name}&format=json&limit=1"
-        headers = {'User-Agent': 'MainRoadFinder/1.0'}
-        response = requests.get(url, headers=headers)
-        data = response.json()
-        if data:
-            return float(data[0]['lat']), float(data[0]['lon'])
-        return None
+        """(lat, lon) of a place, from the gazetteer or geocoding cache when known (see `geocoding`)"""
+        return geocoding.geocode(city_name)
+
+    @staticmethod
+    def get_cities_coords(city_names: list[str]) -> list:
+        """(lat, lon) of many places at once, in order; repeated and known places cost no request"""
+        coords = geocoding.geocode_many(city_names)
+        return [coords[city] for city in city_names]
 
 
 def parser_setter():
@@ -585,30 +481,15 @@ def parser_setter():
 
 def main():
     map_util = MapUtility()
-    city_names = [
-        "Deinze, Flanders, Belgium",
-        "Gavere, Flanders, Belgium",
-        "Velzeke, Belgium",
-        "Strijpen, Belgium",
-        "Oudenaarde, Belgium",
-        "Anzegem, Belgium",
-        "Waregem, Belgium",
-        "Nokere, Flanders, Belgium",
-        "Kruishoutem, Belgium",
-        "Ouwegem, Belgium",
-        "Lange Ast, Belgium",
-        "Wannegem, Belgium",
-        "Nokere, Flanders, Belgium"
-    ]
-    tour_de_france = ["Lille Métropole, France", "Souchez, France", "Mont Cassel, France", "Mont Noir, France", "Lille Métropole, France"]
-    van_vranderen = ["BRUGGE, Belgium", "Bellem, Belgium", "Izegem, Belgium","Deinze, Belgium", "Kruisem, Belgium", "Kluisbergen, Belgium", "Zwalm, Belgium", "Ronse, Belgium"]
-    waypoints = [(map_util.get_city_coords(city)) for city in city_names]
+    city_names = RACES["nokere"]
+    waypoints = map_util.get_cities_coords(city_names)
     result = map_util.get_multi_waypoint_route(waypoints, max_routes_per_segment=3)
     print(result.keys())
-    map_result = result["map"]
+    map_result = map_util.render_route(result)
 
-    # Save map to HTML file
+    # Save map to HTML file, and the routes as GeoJSON
     map_result.save("multi_waypoint_routes_with_alternatives.html")
+    route_render.save_geojson(result, "multi_waypoint_routes.geojson")
     print(f"Routes generated with total primary route distance: {result['total_distance']:.1f}km")
     print(f"Total alternative routes generated: {sum(segment['total_routes'] for segment in result['segments'])}")
     print("Total road names found:", len(result["total_road_names"]))
@@ -1,6 +1,5 @@
 import os
 
-import requests
 from bs4 import BeautifulSoup
 
 from pathlib import Path
@@ -18,6 +17,7 @@ from src import map_function
 from huggingface_hub import list_models
 from src import map_utility
 from src import mdconvert
+from src import http_client
 
 
 description = """
@@ -55,6 +55,7 @@ class VerifyEvent(Tool):
             - title: The title of the webpage.
             - score: The calculated score indicating the likelihood of the website being official.
             - error: If an error occurred during the request, this key will contain the error message.
+            - timed_out: Names of the signals that missed their deadline, only present when some did.
             and other relevant information.
         """
         return url_function.verify_event_website(event_name, url)
@@ -122,6 +123,8 @@ class RoadNameTool(Tool):
 
 
     def setup(self):
+        # One MapUtility for all calls: its route store lets a list that changes one town
+        # recompute only the two segments around it
         self.map_util = map_utility.MapUtility()
 
 
@@ -139,7 +142,7 @@ class RoadNameTool(Tool):
             "total_road_names": all_road,
         }
         """
-        waypoints = [(self.map_util.get_city_coords(city)) for city in city_names]
+        waypoints = self.map_util.get_cities_coords(city_names)
         result = self.map_util.get_multi_waypoint_route(waypoints, max_routes_per_segment=3)
         result = result.get("total_road_names", [])
         return result
@@ -185,7 +188,7 @@ class MarkdownConverterTool(Tool):
             The converted markdown content.
         """
         converter = mdconvert.MarkdownConverter()
-        response = requests.get(url)
+        response = http_client.get(url)
         return converter.convert(response).text_content
 
 
@@ -0,0 +1,158 @@
+import heapq
+
+import numpy as np
+
+from src.geo_distance import EARTH_RADIUS_KM
+
+SIMPLIFY_TOLERANCE_M = 5.0  # well below road width, invisible at any usable zoom
+POLYLINE_PRECISION = 5  # decimals of the Google encoded polyline format, about 1 m
+_MAX_CHUNKS = 7  # 5-bit chunks of the largest zigzag value at precision 5 (360 * 1e5 * 2 < 2**35)
+
+
+def _as_points(points) -> np.ndarray:
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def _project(points: np.ndarray) -> np.ndarray:
+    """Equirectangular (x, y) metres around the polyline's mean latitude, accurate at route scale."""
+    scale = EARTH_RADIUS_KM * 1000 * np.pi / 180
+    cos_lat = np.cos(np.radians(points[:, 0].mean())) if len(points) else 1.0
+    return np.column_stack([points[:, 1] * scale * cos_lat, points[:, 0] * scale])
+
+
+def douglas_peucker(points, tolerance_m: float = SIMPLIFY_TOLERANCE_M) -> np.ndarray:
+    """
+    Indices of the points kept by Douglas-Peucker simplification of a (lat, lon) polyline.
+
+    Every removed point lies within `tolerance_m` metres of the simplified line. The first and
+    last points are always kept. Each split measures a whole range with array operations.
+    """
+    points = _as_points(points)
+    if len(points) <= 2 or tolerance_m <= 0:
+        return np.arange(len(points))
+    xy = _project(points)
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, direction = xy[first], xy[last] - xy[first]
+        offsets = xy[first + 1:last] - start
+        length = np.hypot(*direction)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
+
+def visvalingam(points, tolerance_m: float = SIMPLIFY_TOLERANCE_M) -> np.ndarray:
+    """
+    Indices of the points kept by Visvalingam-Whyatt simplification of a (lat, lon) polyline.
+
+    Points are removed smallest triangle first while their triangle is under `tolerance_m`
+    squared, which keeps the shape of gentle curves better than Douglas-Peucker.
+    """
+    points = _as_points(points)
+    if len(points) <= 2 or tolerance_m <= 0:
+        return np.arange(len(points))
+    xy = _project(points).tolist()
+    threshold = tolerance_m ** 2
+    previous = list(range(-1, len(xy) - 1))
+    following = list(range(1, len(xy) + 1))
+    removed = [False] * len(xy)
+
+    def area(i):
+        (x0, y0), (x1, y1), (x2, y2) = xy[previous[i]], xy[i], xy[following[i]]
+        return abs((x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)) / 2
+
+    heap = [(area(i), i) for i in range(1, len(xy) - 1)]
+    heapq.heapify(heap)
+    current = {i: value for value, i in heap}
+    while heap:
+        value, i = heapq.heappop(heap)
+        if removed[i] or value != current[i]:
+            continue  # stale entry, the point's area changed since
+        if value >= threshold:
+            break
+        removed[i] = True
+        before, after = previous[i], following[i]
+        following[before], previous[after] = after, before
+        for neighbour in (before, after):
+            if 0 < neighbour < len(xy) - 1:
+                # A neighbour's area never drops below the removed one, so removal order stays monotonic
+                current[neighbour] = max(area(neighbour), value)
+                heapq.heappush(heap, (current[neighbour], neighbour))
+    return np.flatnonzero(~np.array(removed))
+
+
+def simplify(points, tolerance_m: float = SIMPLIFY_TOLERANCE_M, method: str = "douglas_peucker") -> np.ndarray:
+    """
+    Simplified (lat, lon) polyline as an (n, 2) array.
+
+    Args:
+        points: (lat, lon) points of the polyline.
+        tolerance_m: Allowed deviation in metres, 0 keeps every point.
+        method: "douglas_peucker" (fast, bounded deviation) or "visvalingam" (area based, smoother).
+    """
+    if method == "douglas_peucker":
+        indices = douglas_peucker(points, tolerance_m)
+    elif method == "visvalingam":
+        indices = visvalingam(points, tolerance_m)
+    else:
+        raise ValueError(f"Unknown simplification method: {method}")
+    return _as_points(points)[indices]
+
+
+def encode_polyline(points, precision: int = POLYLINE_PRECISION) -> str:
+    """
+    Google encoded polyline of (lat, lon) points, e.g. for Leaflet, OSRM or the Maps APIs.
+
+    Coordinates are delta and zigzag encoded, then written as 5-bit chunks in one array pass.
+    """
+    points = _as_points(points)
+    if not len(points):
+        return ""
+    values = np.round(points * 10 ** precision).astype(np.int64)
+    values[1:] -= values[:-1].copy()
+    values = values.ravel()
+    values = np.where(values < 0, ~(values << 1), values << 1)
+
+    shifts = 5 * np.arange(_MAX_CHUNKS)
+    chunks = (values[:, None] >> shifts) & 0x1f
+    more = (values[:, None] >> (shifts + 5)) > 0
+    used = np.ones_like(more)
+    used[:, 1:] = more[:, :-1]
+    chars = (chunks | (more * 0x20)) + 63
+    return chars[used].astype(np.uint8).tobytes().decode("ascii")
+
+
+def decode_polyline(encoded: str, precision: int = POLYLINE_PRECISION) -> np.ndarray:
+    """(lat, lon) points of a Google encoded polyline, as an (n, 2) array."""
+    if not encoded:
+        return np.empty((0, 2))
+    chars = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    last = (chars & 0x20) == 0  # the final chunk of every value has no continuation bit
+    value_of = np.concatenate([[0], np.cumsum(last)[:-1]])
+    value_starts = np.flatnonzero(np.concatenate([[True], last[:-1]]))
+    position = np.arange(len(chars)) - value_starts[value_of]
+    values = np.zeros(int(last.sum()), dtype=np.int64)
+    np.add.at(values, value_of, (chars & 0x1f) << (5 * position))
+    values = np.where(values & 1, ~(values >> 1), values >> 1)
+    return np.cumsum(values.reshape(-1, 2), axis=0) / 10 ** precision
+
+
+def to_float32(points) -> np.ndarray:
+    """
+    (lat, lon) points as a compact float32 (n, 2) array: 8 bytes per point instead of a tuple of
+    two Python floats, with a precision of about 0.5 m at mid latitudes.
+    """
+    return _as_points(points).astype(np.float32)
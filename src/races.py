@@ -0,0 +1,23 @@
+# Waypoints of the races we route, in order. Kept apart from map_utility so benchmarks/bench_routing.py
+# can import them without loading osmnx and openrouteservice.
+RACES = {
+    "nokere": [
+        "Deinze, Flanders, Belgium",
+        "Gavere, Flanders, Belgium",
+        "Velzeke, Belgium",
+        "Strijpen, Belgium",
+        "Oudenaarde, Belgium",
+        "Anzegem, Belgium",
+        "Waregem, Belgium",
+        "Nokere, Flanders, Belgium",
+        "Kruishoutem, Belgium",
+        "Ouwegem, Belgium",
+        "Lange Ast, Belgium",
+        "Wannegem, Belgium",
+        "Nokere, Flanders, Belgium"
+    ],
+    "tour_de_france": ["Lille Métropole, France", "Souchez, France", "Mont Cassel, France", "Mont Noir, France",
+                       "Lille Métropole, France"],
+    "van_vlaanderen": ["BRUGGE, Belgium", "Bellem, Belgium", "Izegem, Belgium", "Deinze, Belgium", "Kruisem, Belgium",
+                       "Kluisbergen, Belgium", "Zwalm, Belgium", "Ronse, Belgium"],
+}
@@ -0,0 +1,470 @@
+import heapq
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from src.geo_distance import EARTH_RADIUS_KM, haversine, polyline_length
+from src.spatial_index import SpatialIndex
+
+# Edge weight = length * factor, so faster road types are preferred
+WEIGHT_FACTORS = {
+    'motorway': 0.7,  # Fast
+    'trunk': 0.8,
+    'primary': 0.9,
+    'secondary': 1.0,  # Normal
+    'tertiary': 1.1,
+    'unclassified': 1.2,
+    'residential': 1.3  # Slow
+}
+MIN_WEIGHT_FACTOR = min(WEIGHT_FACTORS.values())
+
+
+@dataclass
+class EdgeSnap:
+    """A point snapped onto the closest edge `source` -> `target` (node indices)."""
+    edge: int
+    source: int
+    target: int
+    fraction: float  # position along the edge, 0 at `source` and 1 at `target`
+    point: tuple[float, float]  # (lat, lon) of the snapped point
+    distance: float  # km from the query point
+
+
+@dataclass
+class RoadRun:
+    """A stretch of a path along one road: consecutive edges with the same name, ref and road type."""
+    name: str
+    ref: str  # route number, e.g. "N60", empty when the road has none
+    highway: str
+    length: float  # km
+
+
+class RoadGraph:
+    """
+    Directed road graph in compressed sparse row (CSR) form.
+
+    Node `i` is OSM node `node_ids[i]` at `coords[i]` (lat, lon); its outgoing edges are
+    `offsets[i]:offsets[i + 1]` in `targets`, `lengths` (km), `weights` (length scaled by road type),
+    `name_ids`, `highway_ids` and `ref_ids`, the last three indexing the interned `names`, `highways`
+    and `refs` lists.
+    Paths are lists of node indices; `osm_ids` converts them back to OSM node ids.
+    """
+
+    def __init__(self, node_ids, coords, offsets, targets, lengths, weights, name_ids, highway_ids, names, highways,
+                 ref_ids=None, refs=None):
+        self.node_ids = node_ids
+        self.coords = coords
+        self.offsets = offsets
+        self.targets = targets
+        self.lengths = lengths
+        self.weights = weights
+        self.name_ids = name_ids
+        self.highway_ids = highway_ids
+        self.names = names
+        self.highways = highways
+        # Graphs saved before refs were kept have none
+        self.ref_ids = ref_ids if ref_ids is not None else np.zeros(len(targets), dtype=np.int32)
+        self.refs = refs if refs is not None else [""]
+        self._reversed = None
+        self._reverse_order = None
+        self._spatial_index = None
+
+    @classmethod
+    def from_elements(cls, elements: Iterable[dict]) -> "RoadGraph":
+        """Build the graph of the nodes and highway ways of an Overpass response."""
+        node_ids = []
+        coords = []
+        ways = []
+        for element in elements:
+            if element['type'] == 'node':
+                node_ids.append(element['id'])
+                coords.append((element['lat'], element['lon']))
+            elif element['type'] == 'way' and 'highway' in element.get('tags', {}):
+                ways.append(element)
+
+        node_ids = np.array(node_ids, dtype=np.int64)
+        coords = np.array(coords, dtype=np.float64).reshape(-1, 2)
+        order = np.argsort(node_ids, kind='stable')
+        node_ids, coords = node_ids[order], coords[order]
+
+        names = []
+        name_lookup = {}
+        highways = []
+        highway_lookup = {}
+        refs = [""]
+        ref_lookup = {"": 0}
+        way_nodes = []
+        way_index = []
+        edge_name = []
+        edge_highway = []
+        edge_ref = []
+        edge_factor = []
+        two_way = []
+        for i, way in enumerate(ways):
+            tags = way['tags']
+            name = tags.get('name', f"way_{way['id']}")
+            if name not in name_lookup:
+                name_lookup[name] = len(names)
+                names.append(name)
+            highway = tags['highway']
+            if highway not in highway_lookup:
+                highway_lookup[highway] = len(highways)
+                highways.append(highway)
+            way_nodes.extend(way['nodes'])
+            way_index.extend([i] * len(way['nodes']))
+            edge_name.append(name_lookup[name])
+            edge_highway.append(highway_lookup[highway])
+            ref = tags.get('ref', '')
+            if ref not in ref_lookup:
+                ref_lookup[ref] = len(refs)
+                refs.append(ref)
+            edge_ref.append(ref_lookup[ref])
+            edge_factor.append(WEIGHT_FACTORS.get(highway, 1.0))
+            two_way.append(tags.get('oneway', 'no') != 'yes')
+
+        way_nodes = np.array(way_nodes, dtype=np.int64)
+        way_index = np.array(way_index, dtype=np.int64)
+        # Node index of every way node, `valid` is False for nodes missing from the response
+        positions = np.searchsorted(node_ids, way_nodes)
+        positions = np.minimum(positions, max(len(node_ids) - 1, 0))
+        known = len(node_ids) > 0
+        valid = (node_ids[positions] == way_nodes) if known else np.zeros(len(way_nodes), dtype=bool)
+
+        # Consecutive nodes of the same way form an edge
+        consecutive = (way_index[:-1] == way_index[1:]) & valid[:-1] & valid[1:]
+        sources = positions[:-1][consecutive]
+        targets = positions[1:][consecutive]
+        edge_way = way_index[:-1][consecutive]
+
+        edge_name = np.array(edge_name, dtype=np.int32)[edge_way]
+        edge_highway = np.array(edge_highway, dtype=np.int16)[edge_way]
+        edge_ref = np.array(edge_ref, dtype=np.int32)[edge_way]
+        edge_factor = np.array(edge_factor, dtype=np.float64)[edge_way]
+        lengths = haversine(coords[sources, 0], coords[sources, 1], coords[targets, 0], coords[targets, 1])
+
+        # Ways that are not one-way get the reverse edges too
+        reverse = np.array(two_way, dtype=bool)[edge_way]
+        sources, targets = np.concatenate([sources, targets[reverse]]), np.concatenate([targets, sources[reverse]])
+        lengths = np.concatenate([lengths, lengths[reverse]])
+        edge_factor = np.concatenate([edge_factor, edge_factor[reverse]])
+        edge_name = np.concatenate([edge_name, edge_name[reverse]])
+        edge_highway = np.concatenate([edge_highway, edge_highway[reverse]])
+        edge_ref = np.concatenate([edge_ref, edge_ref[reverse]])
+
+        order = np.argsort(sources, kind='stable')
+        offsets = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(node_ids)), out=offsets[1:])
+        return cls(
+            node_ids=node_ids,
+            coords=coords,
+            offsets=offsets,
+            targets=targets[order].astype(np.int32),
+            lengths=lengths[order].astype(np.float32),
+            weights=(lengths * edge_factor)[order].astype(np.float32),
+            name_ids=edge_name[order],
+            highway_ids=edge_highway[order],
+            names=names,
+            highways=highways,
+            ref_ids=edge_ref[order],
+            refs=refs,
+        )
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the graph arrays."""
+        return sum(array.nbytes for array in (
+            self.node_ids, self.coords, self.offsets, self.targets, self.lengths,
+            self.weights, self.name_ids, self.highway_ids, self.ref_ids))
+
+    def memory_bytes(self) -> int:
+        """Approximate memory of the graph including the reverse graph and spatial index built so far."""
+        total = self.nbytes + sum(len(name) + 50 for name in self.names + self.refs)
+        if self._reversed is not None:
+            total += self._reversed.offsets.nbytes + self._reversed.targets.nbytes + self._reverse_order.nbytes
+            total += sum(array.nbytes for array in (
+                self._reversed.lengths, self._reversed.weights, self._reversed.name_ids, self._reversed.highway_ids,
+                self._reversed.ref_ids))
+        if self._spatial_index is not None:
+            total += self.node_count * 5 * 8  # unit vectors and tree indices
+        return total
+
+    def index_of(self, node_id: int) -> Optional[int]:
+        """Node index of an OSM node id, None if the node is not in the graph."""
+        i = int(np.searchsorted(self.node_ids, node_id))
+        if i < len(self.node_ids) and self.node_ids[i] == node_id:
+            return i
+        return None
+
+    @property
+    def spatial_index(self) -> SpatialIndex:
+        """KD-tree over the node coordinates, built on first use."""
+        if self._spatial_index is None:
+            self._spatial_index = SpatialIndex(self.coords)
+        return self._spatial_index
+
+    def nearest_node(self, point) -> Optional[int]:
+        """Index of the node closest to a (lat, lon) point, None for an empty graph."""
+        nearest = self.spatial_index.nearest(point)
+        return nearest[0][0] if nearest else None
+
+    def snap_to_edge(self, point) -> Optional[EdgeSnap]:
+        """
+        Snap a (lat, lon) point onto the closest edge, which may be far closer than the closest node
+        on long straight roads.
+        """
+        nearest = self.spatial_index.nearest(point)
+        if not nearest or not self.edge_count:
+            return None
+        # Any edge closer than the nearest node has both ends within that distance plus its length
+        radius = nearest[0][1] + float(self.lengths.max())
+        # The nearest node is added explicitly, round-off at the radius boundary could leave it out
+        candidates = np.unique(np.array(
+            [nearest[0][0]] + [node for node, _ in self.spatial_index.within(point, radius)], dtype=np.int64))
+        counts = self.offsets[candidates + 1] - self.offsets[candidates]
+        ranges = [np.arange(self.offsets[node], self.offsets[node + 1]) for node in candidates]
+        edges = np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+        if not len(edges):
+            return None
+        sources = np.repeat(candidates, counts)
+        targets = self.targets[edges]
+
+        # Project onto a local plane in km around the query point
+        lat0, lon0 = point
+        scale = np.array([EARTH_RADIUS_KM * math.pi / 180, EARTH_RADIUS_KM * math.pi / 180 * math.cos(math.radians(lat0))])
+        a = (self.coords[sources] - (lat0, lon0)) * scale
+        b = (self.coords[targets] - (lat0, lon0)) * scale
+        ab = b - a
+        squared = (ab ** 2).sum(axis=1)
+        fractions = np.clip(np.divide(-(a * ab).sum(axis=1), squared, out=np.zeros(len(edges)), where=squared > 0), 0, 1)
+        closest = a + fractions[:, None] * ab
+        distances = np.linalg.norm(closest, axis=1)
+
+        best = int(np.argmin(distances))
+        snapped = closest[best] / scale + (lat0, lon0)
+        return EdgeSnap(
+            edge=int(edges[best]),
+            source=int(sources[best]),
+            target=int(targets[best]),
+            fraction=float(fractions[best]),
+            point=(float(snapped[0]), float(snapped[1])),
+            distance=float(distances[best]),
+        )
+
+    def osm_ids(self, path: list[int]) -> list[int]:
+        return self.node_ids[path].tolist()
+
+    def points(self, path: list[int]) -> list[tuple[float, float]]:
+        """(lat, lon) of every node of a path."""
+        return [tuple(point) for point in self.coords[path].tolist()]
+
+    def edge(self, u: int, v: int, weights: Optional[np.ndarray] = None) -> Optional[int]:
+        """Position of the cheapest edge u -> v, None if there is none."""
+        start, end = self.offsets[u], self.offsets[u + 1]
+        matches = np.flatnonzero(self.targets[start:end] == v)
+        if not len(matches):
+            return None
+        weights = self.weights if weights is None else weights
+        return int(start + matches[np.argmin(weights[start + matches])])
+
+    def path_edges(self, path: list[int], weights: Optional[np.ndarray] = None) -> list[int]:
+        """Edge positions along a path (None between nodes that are not connected)."""
+        return [None if edge < 0 else edge for edge in self.path_edge_array(path, weights).tolist()]
+
+    def path_edge_array(self, path: list[int], weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Positions of the cheapest edge between every two consecutive path nodes, -1 where there is none.
+
+        Vectorized form of `edge` for a whole path: the out-edges of every path node are
+        gathered at once and the cheapest one leading to the next node is kept.
+        """
+        path = np.asarray(path, dtype=np.int64)
+        sources, next_nodes = path[:-1], path[1:]
+        edges = np.full(len(sources), -1, dtype=np.int64)
+        if not len(sources):
+            return edges
+        weights = self.weights if weights is None else weights
+        starts = self.offsets[sources]
+        degrees = self.offsets[sources + 1] - starts
+        step = np.repeat(np.arange(len(sources)), degrees)
+        candidates = np.repeat(starts, degrees) + np.arange(len(step)) - np.repeat(np.cumsum(degrees) - degrees, degrees)
+        matching = self.targets[candidates] == next_nodes[step]
+        step, candidates = step[matching], candidates[matching]
+        # Cheapest first within each step, then the first candidate of every step wins
+        order = np.lexsort((weights[candidates], step))
+        step, candidates = step[order], candidates[order]
+        first = np.ones(len(step), dtype=bool)
+        first[1:] = step[1:] != step[:-1]
+        edges[step[first]] = candidates[first]
+        return edges
+
+    def path_length(self, path: list[int]) -> float:
+        """Length of a path in km, following its road geometry."""
+        return polyline_length(self.coords[path])
+
+    def path_weight(self, path: list[int]) -> float:
+        """Sum of the (road type weighted) edge weights along a path."""
+        edges = self.path_edge_array(path)
+        return float(self.weights[edges[edges >= 0]].sum(dtype=np.float64))
+
+    def road_runs(self, path: list[int]) -> list[RoadRun]:
+        """
+        The roads along a path as runs of consecutive edges sharing name, ref and road type, in order.
+
+        A road left and joined again later gives two runs; each run carries the km ridden on it.
+        """
+        edges = self.path_edge_array(path)
+        edges = edges[edges >= 0]
+        if not len(edges):
+            return []
+        keys = np.stack([self.name_ids[edges], self.ref_ids[edges], self.highway_ids[edges]], axis=1)
+        starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)])
+        lengths = np.add.reduceat(self.lengths[edges].astype(np.float64), starts)
+        return [
+            RoadRun(self.names[name_id], self.refs[ref_id], self.highways[highway_id], length)
+            for (name_id, ref_id, highway_id), length in zip(keys[starts].tolist(), lengths.tolist())
+        ]
+
+    def road_names(self, path: list[int]) -> list[str]:
+        """Names of the roads along a path, in order of first appearance."""
+        edges = self.path_edge_array(path)
+        name_ids = self.name_ids[edges[edges >= 0]]
+        unique, first = np.unique(name_ids, return_index=True)
+        return [self.names[name_id] for name_id in unique[np.argsort(first)].tolist()]
+
+    def shortest_path(self, source: int, target: int, weights: Optional[np.ndarray] = None) -> Optional[list[int]]:
+        """
+        A* search from `source` to `target` (node indices).
+
+        The heuristic is the great-circle distance times the smallest weight factor, which never
+        overestimates as long as `weights` are at least the road type weights (e.g. penalized copies).
+
+        Args:
+            source: Start node index.
+            target: End node index.
+            weights: Edge weights to use instead of `self.weights`.
+
+        Returns:
+            The node indices of the cheapest path, or None when `target` is unreachable.
+        """
+        weights = self.weights if weights is None else weights
+        offsets, targets, coords = self.offsets, self.targets, self.coords
+        target_lat, target_lon = coords[target]
+        cos_target = math.cos(math.radians(target_lat))
+
+        def heuristic(node):
+            lat, lon = coords[node]
+            dlat = math.radians(target_lat - lat)
+            dlon = math.radians(target_lon - lon)
+            a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat)) * cos_target * math.sin(dlon / 2) ** 2
+            return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a))) * MIN_WEIGHT_FACTOR
+
+        best = {source: 0.0}
+        previous = {source: -1}
+        queue = [(heuristic(source), 0.0, source)]
+        done = set()
+        while queue:
+            _, cost, node = heapq.heappop(queue)
+            if node == target:
+                path = [node]
+                while previous[path[-1]] != -1:
+                    path.append(previous[path[-1]])
+                return path[::-1]
+            if node in done:
+                continue
+            done.add(node)
+            start, end = offsets[node], offsets[node + 1]
+            for neighbor, weight in zip(targets[start:end].tolist(), weights[start:end].tolist()):
+                new_cost = cost + weight
+                if new_cost < best.get(neighbor, math.inf):
+                    best[neighbor] = new_cost
+                    previous[neighbor] = node
+                    heapq.heappush(queue, (new_cost + heuristic(neighbor), new_cost, neighbor))
+        return None
+
+    def dijkstra(self, source: int, weights: Optional[np.ndarray] = None, reverse: bool = False,
+                 max_cost: float = math.inf) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Shortest-path tree from `source` to every node (or from every node to `source` with `reverse`).
+
+        Args:
+            source: Root node index.
+            weights: Edge weights to use instead of `self.weights`.
+            reverse: Search the reversed graph, giving the cost from every node to `source`.
+            max_cost: Stop the search there, nodes further away are left unreachable.
+
+        Returns:
+            (costs, predecessors): inf / -1 for unreachable nodes. With `reverse`, the "predecessor"
+            of a node is the next node on its way to `source`.
+        """
+        weights = self.weights if weights is None else weights
+        if reverse:
+            graph = self.reversed()
+            order = self._reverse_order
+            weights = weights[order]
+        else:
+            graph = self
+        offsets, targets = graph.offsets, graph.targets
+        costs = np.full(self.node_count, np.inf)
+        predecessors = np.full(self.node_count, -1, dtype=np.int64)
+        costs[source] = 0.0
+        queue = [(0.0, source)]
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if cost > max_cost:
+                break
+            if cost > costs[node]:
+                continue
+            start, end = offsets[node], offsets[node + 1]
+            for neighbor, weight in zip(targets[start:end].tolist(), weights[start:end].tolist()):
+                new_cost = cost + weight
+                if new_cost < costs[neighbor]:
+                    costs[neighbor] = new_cost
+                    predecessors[neighbor] = node
+                    heapq.heappush(queue, (new_cost, neighbor))
+        beyond = costs > max_cost
+        costs[beyond] = np.inf
+        predecessors[beyond] = -1
+        return costs, predecessors
+
+    def reversed(self) -> "RoadGraph":
+        """The graph with every edge reversed (cached)."""
+        if self._reversed is None:
+            sources = np.repeat(np.arange(self.node_count), np.diff(self.offsets))
+            order = np.argsort(self.targets, kind='stable')
+            offsets = np.zeros(self.node_count + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.targets, minlength=self.node_count), out=offsets[1:])
+            self._reverse_order = order
+            self._reversed = RoadGraph(
+                self.node_ids, self.coords, offsets, sources[order].astype(np.int32), self.lengths[order],
+                self.weights[order], self.name_ids[order], self.highway_ids[order], self.names, self.highways,
+                self.ref_ids[order], self.refs)
+        return self._reversed
+
+    def save(self, path: str | Path) -> None:
+        """Write the graph to a `.npz` file, to be loaded again with `RoadGraph.load`."""
+        np.savez_compressed(
+            path, node_ids=self.node_ids, coords=self.coords, offsets=self.offsets, targets=self.targets,
+            lengths=self.lengths, weights=self.weights, name_ids=self.name_ids, highway_ids=self.highway_ids,
+            ref_ids=self.ref_ids, names=np.array(self.names, dtype=object),
+            highways=np.array(self.highways, dtype=object), refs=np.array(self.refs, dtype=object))
+
+    @classmethod
+    def load(cls, path: str | Path) -> "RoadGraph":
+        with np.load(path, allow_pickle=True) as data:
+            arrays = {key: data[key] for key in data.files}
+        arrays["names"] = arrays["names"].tolist()
+        arrays["highways"] = arrays["highways"].tolist()
+        if "refs" in arrays:
+            arrays["refs"] = arrays["refs"].tolist()
+        return cls(**arrays)
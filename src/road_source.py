@@ -0,0 +1,337 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+import numpy as np
+
+from src import disk_cache
+from src import http_client
+from src.tile_cache import TileCacheSource
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+OVERPASS_TTL = 7 * 24 * 3600
+QUERY_CACHE_DIR = disk_cache.CACHE_DIR / "overpass_queries"
+HIGHWAY_TYPES = ("motorway", "trunk", "primary", "secondary", "tertiary", "unclassified", "residential")
+
+# (min_lat, min_lon, max_lat, max_lon), the order Overpass uses
+BBox = tuple[float, float, float, float]
+
+
+def overpass_query(*bboxes: BBox) -> str:
+    """Overpass QL query for the routable ways in the union of bounding boxes and all of their nodes."""
+    ways = "\n".join(
+        f"""          way["highway"~"{'|'.join(HIGHWAY_TYPES)}"]
+            ({min_lat},{min_lon},{max_lat},{max_lon});"""
+        for min_lat, min_lon, max_lat, max_lon in bboxes
+    )
+    return f"""
+        [out:json];
+        (
+{ways}
+        );
+        (._;>;);  // Get all nodes for ways
+        out body;
+        """
+
+
+def iter_json_elements(stream: BinaryIO, metadata: Optional[dict] = None) -> Iterator[dict]:
+    """
+    Elements of an Overpass JSON document read from a binary stream (a file or `response.raw`).
+
+    With the optional `ijson` package the document is parsed incrementally: elements are yielded
+    while the rest is still downloading, and neither the raw text nor the whole document is ever
+    held in memory. Without it the document is parsed in one go.
+
+    When `metadata` is given it receives the document's `bbox` (as written by `save_extract`), if
+    any, once every element has been read.
+    """
+    try:
+        import ijson
+    except ImportError:
+        document = json.load(stream)
+        if metadata is not None and "bbox" in document:
+            metadata["bbox"] = tuple(document["bbox"])
+        yield from document["elements"]
+        return
+    if metadata is None:
+        yield from ijson.items(stream, "elements.item", use_float=True)
+        return
+
+    bbox = []
+
+    def events():
+        for prefix, event, value in ijson.parse(stream, use_float=True):
+            if prefix == "bbox.item":
+                bbox.append(value)
+            yield prefix, event, value
+
+    yield from ijson.items(events(), "elements.item")
+    if bbox:
+        metadata["bbox"] = tuple(bbox)
+
+
+def stream_query(query: str, url: str = OVERPASS_URL) -> Iterator[dict]:
+    """Elements of the response to an Overpass query, parsed as they arrive (see `iter_json_elements`)."""
+    with http_client.post(url, data=query, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True  # let gzip-encoded responses be decompressed while reading
+        yield from iter_json_elements(response.raw)
+
+
+class OverpassSource:
+    """Road data fetched from the Overpass API, one query per call."""
+
+    def __init__(self, url: str = OVERPASS_URL):
+        self.url = url
+
+    def covers(self, bbox: BBox) -> bool:
+        return True
+
+    def elements(self, bbox: BBox) -> list[dict]:
+        """Overpass JSON elements (nodes and ways) of the roads in `bbox`."""
+        return self.union_elements([bbox])
+
+    def union_elements(self, bboxes: list[BBox]) -> list[dict]:
+        """Elements of the roads in any of `bboxes`, fetched with a single query (Overpass removes duplicates)."""
+        return list(self.iter_elements(bboxes))
+
+    def iter_elements(self, bboxes: list[BBox]) -> Iterator[dict]:
+        """Same as `union_elements`, yielded while the response is downloading."""
+        return stream_query(overpass_query(*bboxes), self.url)
+
+
+class ExtractSource:
+    """
+    Road data of a regional OSM extract, loaded from disk once and queried in memory.
+
+    Supports `.osm.pbf` files (requires the `osmium` package) and Overpass JSON dumps
+    (`{"bbox": [...], "elements": [...]}`, as written by `save_extract`). Only the ways in
+    `HIGHWAY_TYPES` are kept.
+
+    Coverage is checked against the box the extract was downloaded for. Extracts without one (PBF
+    files, older dumps) fall back to the extent of their nodes, which over-reports a little since
+    ways crossing the border keep their nodes outside it.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        metadata = {}
+        if self.path.name.endswith(".pbf"):
+            nodes, ways = self._read_pbf(self.path)
+        else:
+            with open(self.path, "rb") as f:
+                nodes, ways = self._read_elements(iter_json_elements(f, metadata))
+        print(f"Loaded {len(ways)} ways and {len(nodes)} nodes from {self.path}")
+
+        self.nodes = nodes
+        self.ways = ways
+        # Bounding box of every way, to select the ways of a query box with array operations
+        way_bounds = np.full((len(ways), 4), np.nan)
+        for i, way in enumerate(ways):
+            coords = np.array([nodes[node_id] for node_id in way["nodes"] if node_id in nodes]).reshape(-1, 2)
+            if len(coords):
+                way_bounds[i] = (*coords.min(axis=0), *coords.max(axis=0))
+        self._way_bounds = way_bounds
+        coords = np.array(list(nodes.values())).reshape(-1, 2)
+        self.bounds = (*coords.min(axis=0), *coords.max(axis=0)) if len(coords) else None
+        # The area the extract was requested for, complete within it unlike the node extent
+        self.bbox = metadata.get("bbox", self.bounds)
+
+    @staticmethod
+    def _read_elements(elements: Iterable[dict]) -> tuple[dict[int, tuple[float, float]], list[dict]]:
+        nodes = {}
+        ways = []
+        for element in elements:
+            if element["type"] == "node":
+                nodes[element["id"]] = (element["lat"], element["lon"])
+            elif element["type"] == "way" and element.get("tags", {}).get("highway") in HIGHWAY_TYPES:
+                ways.append(element)
+        return nodes, ways
+
+    @staticmethod
+    def _read_pbf(path: Path) -> tuple[dict[int, tuple[float, float]], list[dict]]:
+        try:
+            import osmium
+        except ImportError as e:
+            raise ImportError("Reading .osm.pbf extracts requires the `osmium` package (pip install osmium)") from e
+
+        class HighwayHandler(osmium.SimpleHandler):
+            def __init__(self):
+                super().__init__()
+                self.nodes = {}
+                self.ways = []
+
+            def way(self, w):
+                if w.tags.get("highway") not in HIGHWAY_TYPES:
+                    return
+                refs = []
+                for node in w.nodes:
+                    if node.location.valid():
+                        self.nodes[node.ref] = (node.location.lat, node.location.lon)
+                        refs.append(node.ref)
+                self.ways.append({"type": "way", "id": w.id, "nodes": refs, "tags": dict(w.tags)})
+
+        handler = HighwayHandler()
+        handler.apply_file(str(path), locations=True)
+        return handler.nodes, handler.ways
+
+    def covers(self, bbox: BBox) -> bool:
+        """Whether the extract contains the whole bounding box."""
+        if self.bbox is None:
+            return False
+        min_lat, min_lon, max_lat, max_lon = bbox
+        return (self.bbox[0] <= min_lat and self.bbox[1] <= min_lon
+                and max_lat <= self.bbox[2] and max_lon <= self.bbox[3])
+
+    def elements(self, bbox: BBox) -> list[dict]:
+        """The ways crossing `bbox` and all of their nodes, in the same form as an Overpass response."""
+        return self.union_elements([bbox])
+
+    def union_elements(self, bboxes: list[BBox]) -> list[dict]:
+        """The ways crossing any of `bboxes` (each one once) and all of their nodes."""
+        bounds = self._way_bounds
+        crossing = np.zeros(len(bounds), dtype=bool)
+        for min_lat, min_lon, max_lat, max_lon in bboxes:
+            crossing |= ((bounds[:, 0] <= max_lat) & (bounds[:, 2] >= min_lat)
+                         & (bounds[:, 1] <= max_lon) & (bounds[:, 3] >= min_lon))
+        selected = np.flatnonzero(crossing)
+        ways = [self.ways[i] for i in selected]
+        node_ids = dict.fromkeys(node_id for way in ways for node_id in way["nodes"] if node_id in self.nodes)
+        nodes = [{"type": "node", "id": node_id, "lat": self.nodes[node_id][0], "lon": self.nodes[node_id][1]}
+                 for node_id in node_ids]
+        return nodes + ways
+
+
+class FallbackSource:
+    """Uses the first source that covers a bounding box, and the next one when it fails."""
+
+    def __init__(self, sources: list):
+        self.sources = sources
+
+    def covers(self, bbox: BBox) -> bool:
+        return any(source.covers(bbox) for source in self.sources)
+
+    def elements(self, bbox: BBox) -> list[dict]:
+        return self.union_elements([bbox])
+
+    def union_elements(self, bboxes: list[BBox]) -> list[dict]:
+        error = None
+        for source in self.sources:
+            if not all(source.covers(bbox) for bbox in bboxes):
+                continue
+            try:
+                return union_elements(source, bboxes)
+            except Exception as e:
+                print(f"Road source {type(source).__name__} failed: {e}")
+                error = e
+        raise error or ValueError(f"No road source covers {bboxes}")
+
+
+def union_elements(source, bboxes: list[BBox]) -> list[dict]:
+    """
+    Elements of the roads in the union of `bboxes`, each node and way once.
+
+    Uses the source's own `union_elements` (one query for the whole area) when it has one,
+    otherwise merges one `elements` call per box.
+    """
+    if hasattr(source, "union_elements"):
+        return source.union_elements(bboxes)
+    merged = {}
+    for bbox in bboxes:
+        for element in source.elements(bbox):
+            merged.setdefault((element["type"], element["id"]), element)
+    return list(merged.values())
+
+
+def iter_elements(source, bboxes: list[BBox]) -> Iterable[dict]:
+    """
+    Elements of the roads in the union of `bboxes`, streamed when the source supports it
+    (e.g. straight from the Overpass response into `RoadGraph.from_elements`).
+    """
+    if hasattr(source, "iter_elements"):
+        return source.iter_elements(bboxes)
+    return union_elements(source, bboxes)
+
+
+def default_source(extract_path: Optional[str | Path] = None):
+    """
+    The road source used by `MapUtility`: the local extract at `extract_path` (or the
+    `OSM_EXTRACT_PATH` environment variable) with Overpass as fallback, or Overpass alone.
+    Overpass data is cached per map tile on disk.
+    """
+    overpass = TileCacheSource(OverpassSource())
+    extract_path = extract_path or os.getenv("OSM_EXTRACT_PATH")
+    if not extract_path:
+        return overpass
+    return FallbackSource([ExtractSource(extract_path), overpass])
+
+
+def cached_query(query: str, url: str = OVERPASS_URL, ttl: float = OVERPASS_TTL,
+                 cache_dir: str | Path = QUERY_CACHE_DIR) -> Iterator[dict]:
+    """
+    Elements of the response to an arbitrary Overpass query (e.g. by area name, or `out geom`),
+    cached on disk by query text. Bounding-box road queries are better served per tile by `TileCacheSource`.
+
+    Nothing is materialized: a download is parsed as it arrives (see `stream_query`) and written to
+    the cache element by element, as gzipped JSON lines, and a cache hit is read back line by line.
+    The entry only replaces the cache once the whole response went through, so a download that
+    fails or is not read to the end caches nothing.
+    """
+    path = Path(cache_dir) / f"{hashlib.sha256(query.encode('utf-8')).hexdigest()}.jsonl.gz"
+    try:
+        fresh = time.time() - path.stat().st_mtime <= ttl
+    except OSError:
+        fresh = False
+    if fresh:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as f:
+        temp_path = f.name
+    try:
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            for element in stream_query(query, url):
+                f.write(json.dumps(element) + "\n")
+                yield element
+        # Write then rename, so a concurrent reader never sees half a response
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def save_extract(bbox: BBox, path: str | Path, source=None) -> None:
+    """
+    Download the roads of `bbox` (from Overpass by default) into a JSON extract for offline use.
+    The box is saved with the elements, so `ExtractSource.covers` knows what was requested.
+    """
+    elements = (source or OverpassSource()).elements(bbox)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"bbox": list(bbox), "elements": elements}, f)
+    print(f"Saved {len(elements)} elements to {path}")
+
+
+def parser_setter():
+    parser = argparse.ArgumentParser(description="Download a regional road extract for offline routing")
+    parser.add_argument("--bbox", type=float, nargs=4, required=True,
+                        metavar=("MIN_LAT", "MIN_LON", "MAX_LAT", "MAX_LON"), help="Area to download")
+    parser.add_argument("-o", "--output", type=str, required=True, help="JSON file to write")
+    return parser.parse_args()
+
+
+def main():
+    args = parser_setter()
+    save_extract(tuple(args.bbox), args.output)
+
+
+if __name__ == '__main__':
+    main()
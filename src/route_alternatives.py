@@ -0,0 +1,127 @@
+import numpy as np
+
+from src.road_graph import RoadGraph
+
+MAX_STRETCH = 1.4  # an alternative may cost at most this times the shortest route
+MAX_OVERLAP = 0.5  # share of an alternative's length allowed on roads of the routes already chosen
+PENALTY = 1.5  # weight factor on chosen edges when falling back to the penalty method
+MAX_VIA_TRIES = 100  # distinct via-node routes examined before falling back
+
+
+def route_overlap(graph: RoadGraph, route: list[int], others: list[list[int]]) -> float:
+    """
+    Share of `route`'s length (0..1) driven on road segments of `others`, in either direction.
+
+    Overlap is measured on edges rather than nodes, so two routes crossing at a junction do not
+    count as overlapping, while driving the same road the other way does.
+    """
+    shared = set()
+    for other in others:
+        shared.update(frozenset(pair) for pair in zip(other, other[1:]))
+    lengths = [graph.lengths[edge] for edge in graph.path_edges(route)]
+    total = float(sum(lengths))
+    if total == 0:
+        return 1.0
+    overlapping = sum(length for pair, length in zip(zip(route, route[1:]), lengths) if frozenset(pair) in shared)
+    return float(overlapping) / total
+
+
+def _tree_path(predecessors: np.ndarray, node: int) -> list[int]:
+    path = [node]
+    while predecessors[path[-1]] != -1:
+        path.append(int(predecessors[path[-1]]))
+    return path
+
+
+def alternative_routes(
+    graph: RoadGraph,
+    source: int,
+    target: int,
+    max_routes: int = 3,
+    max_stretch: float = MAX_STRETCH,
+    max_overlap: float = MAX_OVERLAP,
+) -> list[list[int]]:
+    """
+    The shortest route plus up to `max_routes - 1` genuinely distinct alternatives (node indices).
+
+    Uses the via-node (plateau) method: one forward shortest-path tree from `source` and one
+    backward tree to `target`, both bounded by `max_stretch`, give the best route through every
+    node at once. Via nodes are tried cheapest first; nodes on an already tried route are skipped
+    since they yield the same route. A candidate is kept when it is a simple path, costs at most
+    `max_stretch` times the shortest route and overlaps the chosen routes by at most `max_overlap`
+    of its length. If that finds too few, the penalty method fills up: the chosen routes' edges are
+    made more expensive and A* is run again, with the same acceptance rules. The result is
+    deterministic for a given graph.
+
+    Returns:
+        Routes ordered shortest first, empty when `target` is unreachable.
+    """
+    shortest = graph.shortest_path(source, target)
+    if shortest is None:
+        return []
+    routes = [shortest]
+    if max_routes <= 1 or len(shortest) < 2:
+        return routes
+
+    best_cost = graph.path_weight(shortest)
+    max_cost = best_cost * max_stretch
+    forward_costs, forward_tree = graph.dijkstra(source, max_cost=max_cost)
+    backward_costs, backward_tree = graph.dijkstra(target, reverse=True, max_cost=max_cost)
+
+    via_costs = forward_costs + backward_costs
+    candidates = np.flatnonzero(via_costs <= max_cost)
+    candidates = candidates[np.lexsort((candidates, via_costs[candidates]))]
+    tried = np.zeros(graph.node_count, dtype=bool)
+    tried[shortest] = True
+    tries = 0
+    for via in candidates.tolist():
+        if len(routes) >= max_routes or tries >= MAX_VIA_TRIES:
+            break
+        if tried[via]:
+            continue
+        tries += 1
+        route = _tree_path(forward_tree, via)[::-1] + _tree_path(backward_tree, via)[1:]
+        tried[route] = True
+        if _acceptable(graph, route, routes, max_overlap):
+            routes.append(route)
+
+    if len(routes) < max_routes:
+        routes.extend(_penalty_routes(graph, source, target, routes, max_routes, max_cost, max_overlap))
+    return routes
+
+
+def _acceptable(graph: RoadGraph, route: list[int], routes: list[list[int]], max_overlap: float) -> bool:
+    return len(set(route)) == len(route) and route_overlap(graph, route, routes) <= max_overlap
+
+
+def _penalty_routes(
+    graph: RoadGraph,
+    source: int,
+    target: int,
+    routes: list[list[int]],
+    max_routes: int,
+    max_cost: float,
+    max_overlap: float,
+) -> list[list[int]]:
+    weights = graph.weights.copy()
+    found = []
+    for _ in range(2 * max_routes):
+        if len(routes) + len(found) >= max_routes:
+            break
+        for route in routes + found:
+            weights[_all_edges(graph, route)] *= PENALTY
+        candidate = graph.shortest_path(source, target, weights)
+        if candidate is None:
+            break
+        if graph.path_weight(candidate) <= max_cost and _acceptable(graph, candidate, routes + found, max_overlap):
+            found.append(candidate)
+    return found
+
+
+def _all_edges(graph: RoadGraph, route: list[int]) -> list[int]:
+    """Every edge between consecutive route nodes, including parallel ones."""
+    edges = []
+    for u, v in zip(route, route[1:]):
+        start = graph.offsets[u]
+        edges.extend((start + np.flatnonzero(graph.targets[start:graph.offsets[u + 1]] == v)).tolist())
+    return edges
@@ -0,0 +1,135 @@
+import json
+from pathlib import Path
+
+from src import polyline
+from src.polyline import SIMPLIFY_TOLERANCE_M
+
+GEOJSON_DIGITS = 6  # decimals kept in GeoJSON coordinates, about 0.1 m
+# Route colors alternating by segment, primary route first then alternatives
+SEGMENT_COLORS = [["blue", "darkblue"], ["purple", "violet"]]
+
+
+def _marker(i: int, count: int) -> tuple[str, str]:
+    """Popup text and icon color of waypoint `i` of `count`."""
+    if i == 0:
+        return "Start", "green"
+    if i == count - 1:
+        return "End", "red"
+    return f"Waypoint {i}", "cadetblue"
+
+
+def render_folium(result: dict, tolerance_m: float = SIMPLIFY_TOLERANCE_M):
+    """
+    Folium map of a `MapUtility.get_multi_waypoint_route` result: a marker per waypoint and a
+    polyline per route, primary routes more opaque than their alternatives.
+
+    folium is only imported here, so headless callers never load it. Routes are simplified to
+    `tolerance_m` metres (0 keeps every node) to keep the HTML small.
+    """
+    import folium
+
+    waypoints = result["waypoints"]
+    center_lat = sum(wp[0] for wp in waypoints) / len(waypoints)
+    center_lon = sum(wp[1] for wp in waypoints) / len(waypoints)
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=10)
+
+    for i, point in enumerate(waypoints):
+        marker_text, color = _marker(i, len(waypoints))
+        folium.Marker(point, popup=marker_text, icon=folium.Icon(color=color)).add_to(m)
+
+    for segment in result["segments"]:
+        i = segment["index"]
+        route_colors = SEGMENT_COLORS[i % len(SEGMENT_COLORS)]
+        for j, route in enumerate(segment["routes"]):
+            folium.PolyLine(
+                polyline.simplify(route["points"], tolerance_m).tolist(),
+                color=route_colors[min(j, len(route_colors) - 1)],
+                weight=5 if j == 0 else 3,
+                opacity=0.9 if j == 0 else 0.6,
+                popup=f"Segment {i + 1}, Route {j + 1}: {route['distance']:.1f}km",
+            ).add_to(m)
+    return m
+
+
+def to_geojson(result: dict, alternatives: bool = True, tolerance_m: float = SIMPLIFY_TOLERANCE_M) -> dict:
+    """
+    GeoJSON FeatureCollection of a `MapUtility.get_multi_waypoint_route` result.
+
+    Waypoints become Points and routes LineStrings, with segment, route, distance and road names
+    as properties. Coordinates are [lon, lat] rounded to GEOJSON_DIGITS.
+
+    Args:
+        result: The routing result.
+        alternatives: Include the alternative routes, not only the primary route of every segment.
+        tolerance_m: Simplification tolerance of the route lines in metres, 0 keeps every node.
+    """
+    features = []
+    waypoints = result["waypoints"]
+    for i, (lat, lon) in enumerate(waypoints):
+        marker_text, _ = _marker(i, len(waypoints))
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [round(lon, GEOJSON_DIGITS), round(lat, GEOJSON_DIGITS)]},
+            "properties": {"waypoint": i, "name": marker_text},
+        })
+    for segment in result["segments"]:
+        routes = segment["routes"] if alternatives else segment["routes"][:1]
+        for j, route in enumerate(routes):
+            features.append({
+                "type": "Feature",
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": polyline.simplify(route["points"], tolerance_m)[:, ::-1]
+                                    .round(GEOJSON_DIGITS).tolist(),
+                },
+                "properties": {
+                    "segment": segment["index"],
+                    "route": j,
+                    "primary": j == 0,
+                    "distance_km": round(route["distance"], 3),
+                    "road_names": route["road_names"],
+                },
+            })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def save_geojson(result: dict, path: str | Path, alternatives: bool = True,
+                 tolerance_m: float = SIMPLIFY_TOLERANCE_M) -> None:
+    """Write `to_geojson(result)` to a file, without indentation to keep it small."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(to_geojson(result, alternatives, tolerance_m), f, separators=(",", ":"), ensure_ascii=False)
+
+
+def compact_result(result: dict, tolerance_m: float = SIMPLIFY_TOLERANCE_M, encoding: str = "polyline") -> dict:
+    """
+    A routing result small enough to pass between agents or store: no map and no node ids, and
+    every route's points simplified to `tolerance_m` metres and encoded.
+
+    Args:
+        result: A `MapUtility.get_multi_waypoint_route` result.
+        tolerance_m: Simplification tolerance in metres, 0 keeps every node.
+        encoding: "polyline" for a Google encoded polyline string per route (JSON friendly),
+            "float32" for an (n, 2) float32 array per route (for NumPy consumers).
+    """
+    if encoding == "polyline":
+        encode = polyline.encode_polyline
+    elif encoding == "float32":
+        encode = polyline.to_float32
+    else:
+        raise ValueError(f"Unknown route encoding: {encoding}")
+
+    segments = []
+    for segment in result["segments"]:
+        routes = [
+            {
+                "distance": route["distance"],
+                "road_names": route["road_names"],
+                "road_runs": route.get("road_runs", []),
+                encoding: encode(polyline.simplify(route["points"], tolerance_m)),
+            }
+            for route in segment["routes"]
+        ]
+        segments.append({
+            key: value for key, value in segment.items() if key != "routes"
+        } | {"routes": routes})
+    return {key: value for key, value in result.items() if key not in ("map", "segments")} | {"segments": segments}
@@ -0,0 +1,82 @@
+import threading
+from typing import Optional
+
+from cachetools import LRUCache
+
+from src.road_graph import RoadGraph
+
+ROUTE_STORE_BYTES = 256 * 1024 * 1024
+GRAPH_SHARE = 0.75  # of the budget, the rest holds routed segments
+KEY_DIGITS = 6  # endpoints closer than about 0.1 m share an entry
+POINT_BYTES = 150  # Python objects behind one route point: node id, (lat, lon) tuple and list slots
+RUN_BYTES = 400  # one road run dict with its strings
+
+Point = tuple[float, float]
+
+
+def segment_key(start_point, end_point) -> tuple[Point, Point]:
+    """Key of a segment: its endpoints rounded to KEY_DIGITS."""
+    return (
+        (round(float(start_point[0]), KEY_DIGITS), round(float(start_point[1]), KEY_DIGITS)),
+        (round(float(end_point[0]), KEY_DIGITS), round(float(end_point[1]), KEY_DIGITS)),
+    )
+
+
+def result_nbytes(result: dict) -> int:
+    """Approximate memory of a routed segment (see `segment_routing.route_on_graph`)."""
+    points = sum(len(route) for route in result["routes"])
+    names = sum(len(name) + 50 for road_names in result["road_names"] for name in road_names)
+    runs = sum(len(road_runs) for road_runs in result.get("road_runs", []))
+    return points * POINT_BYTES + names + runs * RUN_BYTES
+
+
+class RouteStore:
+    """
+    Bounded in-memory store of segment graphs and routed segments, keyed by endpoint pair.
+
+    Lets repeated routing of similar waypoint lists only recompute the segments whose endpoints
+    changed. Both parts are LRU caches accounted in (approximate) bytes rather than entries, so a
+    few large graphs cannot take more than `max_bytes` between them. Thread-safe.
+    """
+
+    def __init__(self, max_bytes: int = ROUTE_STORE_BYTES):
+        graph_bytes = int(max_bytes * GRAPH_SHARE)
+        self.graphs = LRUCache(maxsize=graph_bytes, getsizeof=RoadGraph.memory_bytes)
+        self.results = LRUCache(maxsize=max_bytes - graph_bytes, getsizeof=result_nbytes)
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.graphs.currsize + self.results.currsize)
+
+    def get_result(self, start_point, end_point, max_routes: int) -> Optional[dict]:
+        """The routes of a segment stored by `put_result`, None when unknown."""
+        with self._lock:
+            return self.results.get((segment_key(start_point, end_point), max_routes))
+
+    def put_result(self, start_point, end_point, max_routes: int, result: dict) -> None:
+        self._put(self.results, (segment_key(start_point, end_point), max_routes), result)
+
+    def get_graph(self, start_point, end_point) -> Optional[RoadGraph]:
+        """The road graph of a segment stored by `put_graph`, None when unknown."""
+        with self._lock:
+            return self.graphs.get(segment_key(start_point, end_point))
+
+    def put_graph(self, start_point, end_point, graph: RoadGraph) -> None:
+        self._put(self.graphs, segment_key(start_point, end_point), graph)
+
+    def _put(self, cache: LRUCache, key, value) -> None:
+        with self._lock:
+            try:
+                cache[key] = value
+            except ValueError:
+                pass  # larger than the whole budget, not stored
+
+    def clear(self) -> None:
+        with self._lock:
+            self.graphs.clear()
+            self.results.clear()
+
+    def __repr__(self) -> str:
+        return (f"RouteStore({len(self.graphs)} graphs, {len(self.results)} segments, "
+                f"{self.nbytes / 2 ** 20:.1f} of {(self.graphs.maxsize + self.results.maxsize) / 2 ** 20:.0f} MiB)")
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Callable, Optional
+
+from src import disk_cache
+
+# Seconds a cached result stays valid per provider, overridable with SEARCH_CACHE_TTL_<PROVIDER>
+SEARCH_TTLS = {
+    "serper": 24 * 3600,
+    "serp": 24 * 3600,
+    "ddg": 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+
+# Paid credits spent by one uncached, successful call
+QUOTA_COST = {
+    "serper": 1,
+    "serp": 1,
+    "ddg": 0,
+}
+
+_stats: dict[str, dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry."""
+    query = unicodedata.normalize("NFKC", query)
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def cache_key(provider: str, query: str, params: Optional[dict] = None) -> str:
+    """Cache key of a normalized query plus the extra request parameters that change its result."""
+    payload = json.dumps(
+        {"provider": provider, "q": normalize_query(query), "params": params or {}}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_ttl(provider: str) -> float:
+    env_ttl = os.getenv(f"SEARCH_CACHE_TTL_{provider.upper()}")
+    if env_ttl:
+        return float(env_ttl)
+    return SEARCH_TTLS.get(provider, DEFAULT_TTL)
+
+
+def set_ttl(provider: str, seconds: float) -> None:
+    """Change how long results of `provider` stay cached."""
+    SEARCH_TTLS[provider] = seconds
+
+
+def _count(provider: str, name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        counters = _stats.setdefault(provider, {"hits": 0, "misses": 0, "quota_spent": 0})
+        counters[name] += amount
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """Hit, miss and quota-spend counters per provider since the process started (failed calls spend no quota)."""
+    with _stats_lock:
+        return {provider: dict(counters) for provider, counters in _stats.items()}
+
+
+def cached_search(
+    provider: str,
+    query: str,
+    fetch: Callable[[], Any],
+    params: Optional[dict] = None,
+    is_cacheable: Callable[[Any], bool] = lambda result: True,
+) -> Any:
+    """
+    Return the cached raw result of a search, calling `fetch` and caching its result on a miss.
+
+    Args:
+        provider: The search provider ("serper", "serp", "ddg"), selects the TTL and quota cost.
+        query: The search query, normalized for the cache key.
+        fetch: Performs the real search and returns a JSON-serializable result, the provider's
+            payload as is; it should raise on failed requests.
+        params: Extra request parameters that change the result (never the API key).
+        is_cacheable: Tells whether a fetched result is a success (e.g. not an error payload). Only
+            successes are cached and counted as quota spent.
+
+    Returns:
+        The cached or freshly fetched result.
+    """
+    cache = disk_cache.get_cache("search", compress=True)
+    key = cache_key(provider, query, params)
+    result = cache.get(provider, key)
+    if result is not disk_cache.MISSING:
+        _count(provider, "hits")
+        return result
+
+    _count(provider, "misses")
+    result = fetch()
+    if is_cacheable(result):
+        _count(provider, "quota_spent", QUOTA_COST.get(provider, 1))
+        cache.set(provider, key, result, get_ttl(provider))
+    return result
@@ -1,15 +1,20 @@
+import asyncio
 import os
+from typing import Any, Awaitable, Callable, Iterable
 from dotenv import load_dotenv
 from serpapi import GoogleSearch
-import requests
 import re
 from duckduckgo_search import DDGS
 
+from src import http_client
+from src import search_cache
+
 
 load_dotenv()
 
 
-def search_serp(url_to_check: str) -> list[str]:
+def search_serp(url_to_check: str, raise_errors: bool = False) -> list[str]:
+    """Links of pages mentioning `url_to_check` via SerpAPI; with `raise_errors`, API errors raise ValueError instead of giving []."""
     # Search Google for the URL
     query = f'intext:{url_to_check} -site:{url_to_check}'
     search_params = {
@@ -20,10 +25,14 @@ def search_serp(url_to_check: str) -> list[str]:
     }
 
     # Perform the search using SerpAPI
-    serp_search = GoogleSearch(search_params)
-    data = serp_search.get_dict()
+    data = search_cache.cached_search(
+        "serp", query, lambda: GoogleSearch(search_params).get_dict(), params={"num": 10},
+        is_cacheable=lambda result: "error" not in result,
+    )
     if "error" in data:
         print(f"Error: {data['error']}")
+        if raise_errors:
+            raise ValueError(f"SerpAPI error: {data['error']}")
         return []
     if "organic_results" not in data:
         print("No organic results found.")
@@ -31,20 +40,33 @@ def search_serp(url_to_check: str) -> list[str]:
     return [res.get("link") for res in data.get("organic_results", [])]
 
 
-def search_serper(url_to_check: str) -> list[str]:
+def search_serper(url_to_check: str, raise_errors: bool = False) -> list[str]:
+    """Links of pages mentioning `url_to_check` via Serper; with `raise_errors`, non-200 answers (e.g. 429) raise ValueError instead of giving []."""
     # Search Google for the URL
     query = f'\\"{url_to_check}\\" -site:{url_to_check}'
     search_params = {
         "q": query,  # Search for the event name
         "api_key": os.getenv("SERPER_API_KEY"),
+        "num": 10,  # Serper's default, part of the cache key like in query_serper
     }
 
     # Perform the search using SerperAPI
     base_url = "https://google.serper.dev/search"
-    response = requests.get(base_url, params=search_params)
-    data = response.json()
-    if response.status_code != 200:
-        print(f"Error: {data.get('message', 'Unknown error')}")
+
+    def fetch():
+        # Only a 200 payload is returned (and so cached and counted), the same shape query_serper caches
+        response = http_client.get(base_url, params=search_params)
+        data = response.json()
+        if response.status_code != 200:
+            raise ValueError(f"Serper returned {response.status_code}: {data.get('message', 'Unknown error')}")
+        return data
+
+    try:
+        data = search_cache.cached_search("serper", query, fetch, params={"num": 10})
+    except ValueError as e:
+        print(f"Error: {e}")
+        if raise_errors:
+            raise
         return []
     if 'Query not allowed.' in data.get('message', []):
         return []
@@ -54,7 +76,7 @@ def search_serper(url_to_check: str) -> list[str]:
 def search_ddg(query):
     url = "https://api.duckduckgo.com/"
     params = {"q": query, "format": "json"}
-    response = requests.get(url, params=params)
+    response = http_client.get(url, params=params)
     return response.json()
 
 
@@ -65,11 +87,12 @@ def ddgs_search(url_to_check):
             "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
     )
-    results = []
     query = f"'{url_to_check}' -site:{url_to_check}"
-    for result in ddgs.text(query, max_results=5, backend="html"):
-        results.append(result.get("href"))
-    return results
+
+    def fetch():
+        return [result.get("href") for result in ddgs.text(query, max_results=5, backend="html")]
+
+    return search_cache.cached_search("ddg", query, fetch, params={"max_results": 5})
 
 def query_serp(query):
     search_params = {
@@ -79,13 +102,14 @@ def query_serp(query):
         "google_domain": "google.com",
     }
     base_url = "https://serpapi.com/search.json"
-    response = requests.get(base_url, params=search_params)
 
-    if response.status_code == 200:
-        results = response.json()
-    else:
+    def fetch():
+        response = http_client.get(base_url, params=search_params)
+        if response.status_code == 200:
+            return response.json()
         raise ValueError(response.json())
-    return results
+
+    return search_cache.cached_search("serp", query, fetch, params={"engine": "google", "google_domain": "google.com"})
 
 def query_serper(query: str) -> dict[str]:
     search_params = {
@@ -96,10 +120,66 @@ def query_serper(query: str) -> dict[str]:
 
     # Perform the search using SerperAPI
     base_url = "https://google.serper.dev/search"
-    response = requests.get(base_url, params=search_params)
-    if response.status_code == 200:
-        results = response.json()
-    else:
+
+    def fetch():
+        response = http_client.get(base_url, params=search_params)
+        if response.status_code == 200:
+            return response.json()
         raise ValueError(response.json())
-    return results
 
+    return search_cache.cached_search("serper", query, fetch, params={"num": 10})
+
+
+# Async variants. The providers' clients (SerpAPI, DDGS, the shared HTTP client) are blocking, so each
+# call runs on a worker thread; the event loop stays free and keeps sharing the same connection pools.
+
+async def search_serp_async(url_to_check: str) -> list[str]:
+    return await asyncio.to_thread(search_serp, url_to_check)
+
+
+async def search_serper_async(url_to_check: str) -> list[str]:
+    return await asyncio.to_thread(search_serper, url_to_check)
+
+
+async def ddgs_search_async(url_to_check: str) -> list[str]:
+    return await asyncio.to_thread(ddgs_search, url_to_check)
+
+
+async def query_serp_async(query: str) -> dict:
+    return await asyncio.to_thread(query_serp, query)
+
+
+async def query_serper_async(query: str) -> dict[str]:
+    return await asyncio.to_thread(query_serper, query)
+
+
+async def gather_searches(
+    search: Callable[[str], Awaitable[Any]],
+    queries: Iterable[str],
+    max_concurrency: int = 8,
+    return_exceptions: bool = False,
+) -> list:
+    """
+    Run one async search per query concurrently.
+
+    Args:
+        search: One of the async search functions, e.g. `query_serper_async`.
+        queries: The queries (or URLs, for the backlink searches) to run.
+        max_concurrency: Maximum number of searches in flight.
+        return_exceptions: Return a failed search's exception in its slot instead of raising it.
+
+    Returns:
+        list: The results in the same order as `queries`.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(query):
+        async with semaphore:
+            return await search(query)
+
+    return await asyncio.gather(*(run(query) for query in queries), return_exceptions=return_exceptions)
+
+
+def multi_search(search: Callable[[str], Awaitable[Any]], queries: Iterable[str], **kwargs) -> list:
+    """Blocking helper for `gather_searches`, for callers that are not running an event loop."""
+    return asyncio.run(gather_searches(search, queries, **kwargs))
@@ -0,0 +1,210 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import asdict
+from itertools import pairwise
+from typing import Optional
+
+from src import road_source
+from src.road_graph import RoadGraph
+from src.route_alternatives import alternative_routes
+
+SEGMENT_PADDING = 0.05  # degrees added around a segment's endpoints when fetching its roads
+FETCH_WORKERS = 8
+
+
+def segment_bbox(start_point, end_point, padding: float = SEGMENT_PADDING) -> tuple[float, float, float, float]:
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) around two points with some padding."""
+    return (
+        min(start_point[0], end_point[0]) - padding,
+        min(start_point[1], end_point[1]) - padding,
+        max(start_point[0], end_point[0]) + padding,
+        max(start_point[1], end_point[1]) + padding,
+    )
+
+
+def route_segment(elements: list[dict], start_point, end_point, max_routes: int = 3) -> dict | str:
+    """
+    Route between two points on the roads of an Overpass response.
+
+    Args:
+        elements: Overpass JSON elements (nodes and ways) around the segment.
+        start_point: Starting point (latitude, longitude)
+        end_point: Ending point (latitude, longitude)
+        max_routes: Maximum number of routes to return
+    Returns:
+        {
+        "routes": routes,
+        "segment_points": segment_points,
+        "distances": distances,
+        "road_names": all_road_names,
+        "road_runs": the roads of every route as (name, ref, highway, length km) runs, see `RoadGraph.road_runs`
+        }
+        or an error message.
+    """
+    # Create a compact graph from the data (directed, for one-way roads)
+    graph = RoadGraph.from_elements(elements)
+    return route_on_graph(graph, start_point, end_point, max_routes)
+
+
+def route_on_graph(graph: RoadGraph, start_point, end_point, max_routes: int = 3) -> dict | str:
+    """Same as `route_segment`, on an already built graph."""
+    # Find the nearest graph nodes to our start and end points
+    start_index = graph.nearest_node(start_point)
+    end_index = graph.nearest_node(end_point)
+
+    if start_index is None or end_index is None:
+        return "Could not find suitable start/end nodes in the graph"
+
+    # Find the shortest route and genuinely distinct alternatives
+    paths = alternative_routes(graph, start_index, end_index, max_routes)
+    if not paths:
+        return "No route found between the specified points"
+
+    return {
+        "routes": [graph.osm_ids(path) for path in paths],
+        "segment_points": [graph.points(path) for path in paths],
+        "distances": [graph.path_length(path) for path in paths],
+        "road_names": [graph.road_names(path) for path in paths],
+        "road_runs": [[asdict(run) for run in graph.road_runs(path)] for path in paths],
+    }
+
+
+# Corridor graph of the current routing process, set once per worker by `_set_corridor_graph`
+_corridor_graph: Optional[RoadGraph] = None
+
+
+def _set_corridor_graph(graph: RoadGraph) -> None:
+    global _corridor_graph
+    _corridor_graph = graph
+
+
+def _timed_corridor_route(start_point, end_point, max_routes):
+    start = time.perf_counter()
+    result = route_on_graph(_corridor_graph, start_point, end_point, max_routes)
+    return result, time.perf_counter() - start
+
+
+def build_corridor_graph(roads, waypoints: list, padding: float = SEGMENT_PADDING,
+                         segments: Optional[list] = None) -> RoadGraph:
+    """
+    One road graph for a whole race: the roads of the union of all segment boxes, fetched with a
+    single query and built once, instead of one overlapping download and graph per segment.
+    `segments` ((start, end) pairs) replaces the consecutive waypoint pairs when given.
+    """
+    segments = list(pairwise(waypoints)) if segments is None else segments
+    bboxes = [segment_bbox(start_point, end_point, padding) for start_point, end_point in segments]
+    start = time.perf_counter()
+    # Elements go straight from the download into the graph builder when the source streams
+    graph = RoadGraph.from_elements(road_source.iter_elements(roads, bboxes))
+    print(f"Corridor graph: {graph.node_count} nodes, {graph.edge_count} edges "
+          f"(fetched and built in {time.perf_counter() - start:.2f}s)")
+    return graph
+
+
+def route_corridor(
+    graph: RoadGraph,
+    waypoints: list,
+    max_routes: int = 3,
+    max_workers: Optional[int] = None,
+    processes: bool = False,
+    segments: Optional[list] = None,
+) -> list[tuple[dict | str, dict]]:
+    """
+    Route every consecutive pair of waypoints on one shared corridor graph (see `build_corridor_graph`).
+
+    Args:
+        graph: The corridor graph.
+        waypoints: (lat, lon) points to visit in order.
+        max_routes: Maximum number of routes per segment.
+        max_workers: Size of the process pool when `processes` is set.
+        processes: Route the segments on a process pool; the graph is sent once to each worker.
+        segments: (start, end) pairs to route instead of the consecutive waypoint pairs.
+
+    Returns:
+        One (result, timings) pair per segment, in order, like `route_segments_parallel`
+        (the fetch time is shared by the whole corridor, so it is 0 here).
+    """
+    segments = list(pairwise(waypoints)) if segments is None else segments
+    if processes:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_set_corridor_graph,
+            initargs=(graph,),
+        ) as router:
+            routed = list(router.map(_timed_corridor_route, *zip(*segments), [max_routes] * len(segments)))
+    else:
+        _set_corridor_graph(graph)
+        routed = [_timed_corridor_route(start_point, end_point, max_routes) for start_point, end_point in segments]
+    return [(result, {"fetch": 0.0, "route": seconds, "total": seconds}) for result, seconds in routed]
+
+
+def _timed_route(elements, start_point, end_point, max_routes):
+    start = time.perf_counter()
+    result = route_segment(elements, start_point, end_point, max_routes)
+    return result, time.perf_counter() - start
+
+
+def route_segments_parallel(
+    roads,
+    waypoints: list,
+    max_routes: int = 3,
+    max_workers: Optional[int] = None,
+    processes: bool = True,
+    segments: Optional[list] = None,
+) -> list[tuple[dict | str, dict]]:
+    """
+    Route every consecutive pair of waypoints concurrently.
+
+    Road data of all segments is fetched on a thread pool (network I/O), and each segment is
+    routed on a process pool (CPU-bound graph search) as soon as its data arrives, so a slow
+    download or search only delays its own segment.
+
+    Args:
+        roads: Road source with an `elements(bbox)` method, see `road_source`.
+        waypoints: (lat, lon) points to visit in order.
+        max_routes: Maximum number of routes per segment.
+        max_workers: Size of the routing pool, defaults to the number of CPUs.
+        processes: Route on processes; False routes on threads (e.g. where processes cannot be spawned).
+        segments: (start, end) pairs to route instead of the consecutive waypoint pairs.
+
+    Returns:
+        One (result, timings) pair per segment, in order. `result` is what `route_segment` returns
+        (an error message when the segment failed); `timings` holds the `fetch`, `route` and
+        `total` seconds spent on the segment.
+    """
+    segments = list(pairwise(waypoints)) if segments is None else segments
+    results: list = [None] * len(segments)
+    timings = [{"fetch": 0.0, "route": 0.0, "total": 0.0} for _ in segments]
+
+    def fetch(i):
+        start = time.perf_counter()
+        try:
+            return roads.elements(segment_bbox(*segments[i]))
+        finally:
+            timings[i]["fetch"] = time.perf_counter() - start
+
+    if processes:
+        # Spawned workers do not inherit the fetch threads (forking a threaded process can deadlock)
+        router = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        router = ThreadPoolExecutor(max_workers=max_workers)
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(segments) or 1)) as fetcher, router:
+        pending = {fetcher.submit(fetch, i): ("fetch", i) for i in range(len(segments))}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, i = pending.pop(future)
+                try:
+                    value = future.result()
+                except Exception as e:
+                    results[i] = f"Segment {stage} failed: {e}"
+                    timings[i]["total"] = timings[i]["fetch"]
+                    continue
+                if stage == "fetch":
+                    pending[router.submit(_timed_route, value, *segments[i], max_routes)] = ("route", i)
+                else:
+                    results[i], timings[i]["route"] = value
+                    timings[i]["total"] = timings[i]["fetch"] + timings[i]["route"]
+    return list(zip(results, timings))
@@ -0,0 +1,157 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+# Seconds a signal may wait for its host slot when the run itself has no deadline
+QUEUE_TIMEOUT = 60.0
+
+
+@dataclass
+class Signal:
+    """A single independent check run by `run_signals`."""
+    name: str
+    func: Callable[[], Any]
+    timeout: Optional[float] = None
+    host: Optional[str] = None
+
+
+@dataclass
+class SignalResult:
+    """Outcome of one signal: its value, or the error / timeout that replaced it."""
+    name: str
+    value: Any = None
+    error: Optional[BaseException] = None
+    timed_out: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out
+
+
+class HostLimiter:
+    """
+    Caps how many signals may talk to the same remote host at once.
+
+    Limits are shared by every `run_signals` call given the same limiter, so a batch of verifications
+    never has more than `limits[host]` requests in flight against e.g. Serper or WHOIS.
+    """
+
+    def __init__(self, limits: Optional[dict[str, int]] = None, default_limit: int = 4):
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.limits.get(host, self.default_limit))
+            return self._semaphores[host]
+
+
+def _timed_call(
+    func: Callable[[], Any],
+    started: dict,
+    semaphore: Optional[threading.BoundedSemaphore] = None,
+    queue_deadline: float = 0.0,
+) -> tuple[Any, float]:
+    if semaphore is None:
+        started["at"] = time.monotonic()
+        return func(), time.monotonic() - started["at"]
+    if not semaphore.acquire(timeout=max(0.0, queue_deadline - time.monotonic())):
+        raise TimeoutError("No host slot before the deadline")
+    try:
+        if started.get("abandoned"):
+            raise TimeoutError("Signal abandoned while waiting for a host slot")
+        started["at"] = time.monotonic()
+        return func(), time.monotonic() - started["at"]
+    finally:
+        semaphore.release()
+
+
+def run_signals(
+    signals: list[Signal],
+    total_timeout: Optional[float] = None,
+    default_timeout: Optional[float] = None,
+    max_workers: Optional[int] = None,
+    limiter: Optional[HostLimiter] = None,
+) -> dict[str, SignalResult]:
+    """
+    Run independent signals concurrently and collect whatever finishes in time.
+
+    Each signal gets its own deadline (`Signal.timeout`, or `default_timeout`), counted from the moment
+    it actually starts (after waiting for its host slot) and capped by the deadline of the whole run
+    (`total_timeout`). Waiting for a host slot is bounded by the run deadline, or by QUEUE_TIMEOUT when
+    there is none. Signals still running when their deadline passes are reported as timed out and
+    abandoned; their worker threads are not waited for.
+
+    Args:
+        signals: The signals to run.
+        total_timeout: Seconds allowed for the whole run, or None for no limit.
+        default_timeout: Seconds allowed per signal when the signal has no timeout of its own.
+        max_workers: Size of the thread pool, defaults to one thread per signal.
+        limiter: Optional per-host concurrency limiter applied to signals that name a `host`.
+
+    Returns:
+        dict: Signal name -> SignalResult, in the order the signals were given.
+    """
+    results = {signal.name: SignalResult(name=signal.name) for signal in signals}
+    if not signals:
+        return results
+
+    start = time.monotonic()
+    run_deadline = start + total_timeout if total_timeout is not None else float("inf")
+    queue_deadline = min(run_deadline, start + QUEUE_TIMEOUT)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(signals), thread_name_prefix="signal")
+    try:
+        pending = {}
+        for signal in signals:
+            timeout = signal.timeout if signal.timeout is not None else default_timeout
+            semaphore = limiter.semaphore(signal.host) if limiter is not None and signal.host else None
+            started = {"queued": semaphore is not None}
+            future = executor.submit(_timed_call, signal.func, started, semaphore, queue_deadline)
+            pending[future] = (signal.name, timeout, started)
+
+        def deadline_of(timeout, started):
+            if "at" not in started:
+                return queue_deadline if started.get("queued") else run_deadline
+            if timeout is None:
+                return run_deadline
+            return min(started["at"] + timeout, run_deadline)
+
+        while pending:
+            next_deadline = min(deadline_of(timeout, started) for _, timeout, started in pending.values())
+            # Signals still queued for a host slot have no deadline yet, so poll at least every 100 ms
+            wait_for = max(0.0, min(next_deadline - time.monotonic(), 0.1))
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name, _, started = pending.pop(future)
+                try:
+                    results[name].value, results[name].elapsed = future.result()
+                except TimeoutError as e:
+                    if "at" in started:
+                        results[name].error = e
+                    else:
+                        results[name].timed_out = True  # never got a host slot
+                    results[name].elapsed = time.monotonic() - started.get("at", start)
+                except Exception as e:
+                    results[name].error = e
+                    results[name].elapsed = time.monotonic() - started.get("at", start)
+
+            now = time.monotonic()
+            for future, (name, timeout, started) in list(pending.items()):
+                if deadline_of(timeout, started) <= now:
+                    pending.pop(future)
+                    started["abandoned"] = True
+                    future.cancel()
+                    results[name].timed_out = True
+                    results[name].elapsed = now - started.get("at", start)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
@@ -0,0 +1,89 @@
+from typing import Hashable, Optional, Sequence
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from src.geo_distance import EARTH_RADIUS_KM
+
+
+def to_xyz(coords) -> np.ndarray:
+    """(lat, lon) degrees -> 3D points on a sphere of the earth's radius, so euclidean distance is the chord."""
+    coords = np.radians(np.asarray(coords, dtype=np.float64).reshape(-1, 2))
+    lat, lon = coords[:, 0], coords[:, 1]
+    cos_lat = np.cos(lat)
+    return EARTH_RADIUS_KM * np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord):
+    """Great-circle distance of a chord length, both in km."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.asarray(chord) / (2 * EARTH_RADIUS_KM)))
+
+
+def km_to_chord(km):
+    return 2 * EARTH_RADIUS_KM * np.sin(np.minimum(np.pi / 2, np.asarray(km) / (2 * EARTH_RADIUS_KM)))
+
+
+class SpatialIndex:
+    """
+    KD-tree over (lat, lon) points for nearest-neighbour and radius queries.
+
+    Points are projected onto a sphere, so results are exact great-circle nearest neighbours
+    anywhere on earth (no distortion near the poles or the antimeridian). Distances are in km.
+    """
+
+    def __init__(self, coords, ids: Optional[Sequence[Hashable]] = None):
+        """
+        Args:
+            coords: (lat, lon) of every point.
+            ids: What queries return for each point, defaults to the point's position in `coords`.
+        """
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.ids = list(ids) if ids is not None else None
+        self._tree = cKDTree(to_xyz(self.coords)) if len(self.coords) else None
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def _id(self, i: int):
+        return self.ids[i] if self.ids is not None else int(i)
+
+    def nearest(self, point, k: int = 1) -> list[tuple[Hashable, float]]:
+        """The `k` points closest to `point` as (id, distance km), closest first."""
+        if self._tree is None:
+            return []
+        k = min(k, len(self))
+        chords, positions = self._tree.query(to_xyz(point)[0], k=k)
+        chords, positions = np.atleast_1d(chords), np.atleast_1d(positions)
+        return [(self._id(i), float(d)) for i, d in zip(positions, chord_to_km(chords))]
+
+    def nearest_many(self, points) -> tuple[np.ndarray, np.ndarray]:
+        """Positions (in `coords`) and distances (km) of the closest point to each of many points."""
+        if self._tree is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        chords, positions = self._tree.query(to_xyz(points), k=1)
+        return positions, chord_to_km(chords)
+
+    def within(self, point, radius_km: float) -> list[tuple[Hashable, float]]:
+        """Every point within `radius_km` of `point` as (id, distance km), closest first."""
+        if self._tree is None:
+            return []
+        positions = self._tree.query_ball_point(to_xyz(point)[0], km_to_chord(radius_km))
+        if not positions:
+            return []
+        distances = chord_to_km(np.linalg.norm(to_xyz(self.coords[positions]) - to_xyz(point), axis=1))
+        order = np.argsort(distances, kind='stable')
+        return [(self._id(positions[i]), float(distances[i])) for i in order]
+
+
+def nearest_node(G, point, nodes: dict) -> Optional[Hashable]:
+    """
+    Id of the node of `nodes` ({id: (lat, lon)}) closest to `point`.
+
+    The index is built on the first query and kept in `G.graph`, so the following queries on the
+    same networkx graph cost a tree lookup instead of a scan over every node.
+    """
+    index = G.graph.get("spatial_index")
+    if index is None or len(index) != len(nodes):
+        index = G.graph["spatial_index"] = SpatialIndex(list(nodes.values()), ids=list(nodes))
+    nearest = index.nearest(point)
+    return nearest[0][0] if nearest else None
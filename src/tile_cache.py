@@ -0,0 +1,190 @@
+import io
+import json
+import math
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from src import disk_cache
+
+TILE_ZOOM = 12  # about 0.09 x 0.05 degrees in Flanders
+TILE_TTL = 7 * 24 * 3600
+TILE_DIR = disk_cache.CACHE_DIR / "tiles"
+COORD_SCALE = 10_000_000  # coordinates are stored as int32 1e-7 degrees, the precision of OSM itself
+
+Tile = tuple[int, int, int]  # (zoom, x, y)
+BBox = tuple[float, float, float, float]  # (min_lat, min_lon, max_lat, max_lon)
+
+
+def tile_of(lat: float, lon: float, zoom: int = TILE_ZOOM) -> tuple[int, int]:
+    """Slippy map (x, y) of the tile containing a point."""
+    n = 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bbox(tile: Tile) -> BBox:
+    """(min_lat, min_lon, max_lat, max_lon) of a tile."""
+    zoom, x, y = tile
+    n = 2 ** zoom
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0
+
+
+def tiles_for_bbox(bbox: BBox, zoom: int = TILE_ZOOM) -> list[Tile]:
+    """Every tile overlapping a bounding box."""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    x0, y0 = tile_of(max_lat, min_lon, zoom)  # tile rows grow southwards
+    x1, y1 = tile_of(min_lat, max_lon, zoom)
+    return [(zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def encode_tile(nodes: list[dict], ways: list[dict]) -> bytes:
+    """Compact binary form of a tile's elements: NumPy arrays for ids, coordinates and node lists."""
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        node_ids=np.array([node["id"] for node in nodes], dtype=np.int64),
+        node_coords=np.round(np.array([(node["lat"], node["lon"]) for node in nodes], dtype=np.float64)
+                             .reshape(-1, 2) * COORD_SCALE).astype(np.int32),
+        way_ids=np.array([way["id"] for way in ways], dtype=np.int64),
+        way_offsets=np.cumsum([0] + [len(way["nodes"]) for way in ways]).astype(np.int64),
+        way_refs=np.array([ref for way in ways for ref in way["nodes"]], dtype=np.int64),
+        way_tags=np.frombuffer(json.dumps([way.get("tags", {}) for way in ways]).encode("utf-8"), dtype=np.uint8),
+    )
+    return buffer.getvalue()
+
+
+def decode_tile(data: bytes) -> list[dict]:
+    """Overpass-style elements of an encoded tile."""
+    with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+        node_ids = arrays["node_ids"].tolist()
+        node_coords = (arrays["node_coords"] / COORD_SCALE).tolist()
+        way_ids = arrays["way_ids"].tolist()
+        way_offsets = arrays["way_offsets"].tolist()
+        way_refs = arrays["way_refs"].tolist()
+        way_tags = json.loads(arrays["way_tags"].tobytes().decode("utf-8"))
+    elements = [{"type": "node", "id": node_id, "lat": lat, "lon": lon}
+                for node_id, (lat, lon) in zip(node_ids, node_coords)]
+    elements.extend(
+        {"type": "way", "id": way_id, "nodes": way_refs[start:end], "tags": tags}
+        for way_id, start, end, tags in zip(way_ids, way_offsets, way_offsets[1:], way_tags)
+    )
+    return elements
+
+
+def split_by_tiles(elements: Iterable[dict], tiles: list[Tile]) -> dict[Tile, tuple[list[dict], list[dict]]]:
+    """Assign the ways of a response to every tile their bounding box overlaps, with their nodes."""
+    nodes = {}
+    ways = []
+    for element in elements:
+        if element["type"] == "node":
+            nodes[element["id"]] = element
+        elif element["type"] == "way":
+            ways.append(element)
+
+    bounds = np.full((len(ways), 4), np.nan)
+    for i, way in enumerate(ways):
+        coords = np.array([(nodes[ref]["lat"], nodes[ref]["lon"]) for ref in way["nodes"] if ref in nodes]).reshape(-1, 2)
+        if len(coords):
+            bounds[i] = (*coords.min(axis=0), *coords.max(axis=0))
+
+    split = {}
+    for tile in tiles:
+        min_lat, min_lon, max_lat, max_lon = tile_bbox(tile)
+        selected = np.flatnonzero(
+            (bounds[:, 0] <= max_lat) & (bounds[:, 2] >= min_lat)
+            & (bounds[:, 1] <= max_lon) & (bounds[:, 3] >= min_lon)
+        )
+        tile_ways = [ways[i] for i in selected]
+        refs = dict.fromkeys(ref for way in tile_ways for ref in way["nodes"] if ref in nodes)
+        split[tile] = ([nodes[ref] for ref in refs], tile_ways)
+    return split
+
+
+class TileCacheSource:
+    """
+    Caches the road data of another source (with a `union_elements` method, see `road_source`)
+    per slippy map tile, on disk in a compact binary format.
+
+    A bounding box is served by assembling its cached tiles; only the missing (or expired) tiles
+    are fetched, all with one `union_elements` query, so repeated and overlapping queries become
+    local disk reads. Results cover whole tiles, i.e. somewhat more than the box asked for.
+
+    `iter_elements` decodes cached tiles one at a time, so a graph built from it never holds more
+    than one decoded tile plus the missing (fetched) ones, which must be complete to be split.
+    """
+
+    def __init__(self, source, zoom: int = TILE_ZOOM, cache_dir: str | Path = TILE_DIR, ttl: float = TILE_TTL):
+        self.source = source
+        self.zoom = zoom
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+
+    def covers(self, bbox: BBox) -> bool:
+        return self.source.covers(bbox)
+
+    def _path(self, tile: Tile) -> Path:
+        zoom, x, y = tile
+        return self.cache_dir / str(zoom) / str(x) / f"{y}.npz"
+
+    def _read(self, tile: Tile):
+        path = self._path(tile)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                return None
+            return decode_tile(path.read_bytes())
+        except (OSError, ValueError, KeyError):
+            return None  # missing or unreadable, fetched again
+
+    def _write(self, tile: Tile, data: bytes) -> None:
+        path = self._path(tile)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so a concurrent reader never sees half a tile
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as f:
+            f.write(data)
+        os.replace(f.name, path)
+
+    def elements(self, bbox: BBox) -> list[dict]:
+        return self.union_elements([bbox])
+
+    def union_elements(self, bboxes: list[BBox]) -> list[dict]:
+        # Nodes first, like an Overpass response
+        return sorted(self.iter_elements(bboxes), key=lambda element: element["type"] != "node")
+
+    def iter_elements(self, bboxes: list[BBox]) -> Iterator[dict]:
+        """Same elements as `union_elements`, tile by tile and without the node-first ordering."""
+        tiles = list(dict.fromkeys(tile for bbox in bboxes for tile in tiles_for_bbox(bbox, self.zoom)))
+        seen = set()  # elements shared by neighbouring tiles are yielded once
+
+        def unseen(elements):
+            for element in elements:
+                key = (element["type"], element["id"])
+                if key not in seen:
+                    seen.add(key)
+                    yield element
+
+        missing = []
+        for tile in tiles:
+            elements = self._read(tile)
+            if elements is None:
+                missing.append(tile)
+            else:
+                yield from unseen(elements)
+        print(f"Road tiles: {len(tiles) - len(missing)} cached, {len(missing)} to fetch")
+        if missing:
+            # Split the response into tiles while it streams in when the source can stream
+            fetch = getattr(self.source, "iter_elements", self.source.union_elements)
+            fetched = fetch([tile_bbox(tile) for tile in missing])
+            for tile, (nodes, ways) in split_by_tiles(fetched, missing).items():
+                self._write(tile, encode_tile(nodes, ways))
+                yield from unseen(nodes + ways)
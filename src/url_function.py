@@ -4,7 +4,6 @@ import socket
 import ssl
 from urllib.parse import urlparse
 
-import requests
 import tldextract
 import whois
 from bs4 import BeautifulSoup
@@ -18,81 +17,191 @@ from src import my_tools
 from src import url_phase
 from src import backlink_check
 from src import search_function
+from src import signal_engine
+from src import disk_cache
+from src import http_client
+
+SIGNAL_TIMEOUT = 15.0  # seconds allowed for any single signal
+TOTAL_TIMEOUT = 30.0  # seconds allowed for the whole verification
+
+# Registrant and certificate data change about once a year, lookups are cached per registered domain
+WHOIS_TTL = 30 * 24 * 3600
+SSL_TTL = 7 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600  # failed lookups are retried after a day
+
+# Details reported for a signal that failed or timed out
+SIGNAL_FALLBACKS = {
+    "page": {},
+    "whois": {"whois_org": "N/A"},
+    "ssl": {"ssl_org": None},
+    "ranking": {"google_search_rank": "Not found in top 10"},
+    "wikipedia": {},
+    "backlinks": {"backlinks": []},
+}
+
+
+def verify_event_website(event_name, url, signal_timeout=SIGNAL_TIMEOUT, total_timeout=TOTAL_TIMEOUT, limiter=None):
+    """
+    Score how likely `url` is the official website of `event_name`.
+
+    The page fetch, WHOIS, SSL, search ranking, Wikipedia and backlink checks are independent, so they
+    run concurrently. A signal that misses its deadline scores nothing and is listed under `timed_out`.
+
+    Args:
+        event_name (str): The name of the event (e.g., "Tour de France").
+        url (str): The URL of the website to verify.
+        signal_timeout (float): Seconds allowed for each signal.
+        total_timeout (float): Seconds allowed for the whole verification.
+        limiter (signal_engine.HostLimiter): Optional per-host concurrency caps, shared across calls.
 
-def verify_event_website(event_name, url):
+    Returns:
+        dict: Verification details, including the final `score`.
+    """
+    event_name_lower = event_name.lower()
+    domain_parts = tldextract.extract(url)
+    domain = domain_parts.domain + '.' + domain_parts.suffix
+
+    target_host = urlparse(url).netloc.lower()
+
+    signals = [
+        signal_engine.Signal("page", lambda: page_signal(url), host=target_host),
+        signal_engine.Signal("whois", lambda: whois_signal(domain, event_name_lower), host="whois"),
+        signal_engine.Signal("ssl", lambda: ssl_signal(domain, event_name_lower), host=target_host),
+        signal_engine.Signal("ranking", lambda: ranking_signal(event_name, url), host="serper"),
+        signal_engine.Signal("wikipedia", lambda: wikipedia_signal(event_name, url), host="wikipedia"),
+        signal_engine.Signal("backlinks", lambda: backlink_signal(url), host="serper"),
+    ]
+    results = signal_engine.run_signals(
+        signals, total_timeout=total_timeout, default_timeout=signal_timeout, limiter=limiter
+    )
+    return score_signals(event_name, url, domain, results)
+
+
+def score_signals(event_name, url, domain, results):
+    """Combine the signal results of one verification into the `details` dict."""
     score = 0
     details = {}
 
-    # Normalize inputs
-    event_name_lower = event_name.lower()
-    headers = {"User-Agent": "Mozilla/5.0"}
+    if any(part in domain.lower() for part in event_name.lower().replace("de", "").split()):
+        score += 1
+
+    timed_out = []
+    for name, result in results.items():
+        if result.ok:
+            points, fragment = result.value
+        else:
+            points, fragment = 0, dict(SIGNAL_FALLBACKS[name])
+            if result.timed_out:
+                timed_out.append(name)
+        score += points
+        details.update(fragment)
+        if name == "page":
+            details["domain"] = domain
+
+    if timed_out:
+        details["timed_out"] = timed_out
+
+    # Final trust score
+    details["event_name"] = event_name
+    details["url"] = url
+    details["score"] = score
 
+    return details
+
+
+def page_signal(url):
+    """Fetch the page itself; only contributes an `error` entry when it cannot be loaded."""
+    headers = {"User-Agent": "Mozilla/5.0"}
+    response = None
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_client.get(url, headers=headers, timeout=10)
         response.raise_for_status()
     except HTTPError as http_err:
         if response.status_code == 403:
-            details = {"error": "Access forbidden: 403 Forbidden", "score": -10}
+            return 0, {"error": "Access forbidden: 403 Forbidden", "score": -10}
         elif response.status_code == 404:
-            details = {"error": "Page not found: 404 Not Found", "score": -10}
+            return 0, {"error": "Page not found: 404 Not Found", "score": -10}
         elif response.status_code == 500:
-            details = {"error": "Server error: 500 Internal Server Error", "score": -10}
-        else:
-            details = {"error": f"HTTP error occurred: {http_err}", "score": -10}
+            return 0, {"error": "Server error: 500 Internal Server Error", "score": -10}
+        return 0, {"error": f"HTTP error occurred: {http_err}", "score": -10}
     except Timeout as timeout_err:
-        details = {"error": f"Request timed out: {timeout_err}", "score": -10}
+        return 0, {"error": f"Request timed out: {timeout_err}", "score": -10}
     except RequestException as req_err:
-        details = {"error": f"Request error occurred: {req_err}", "score": -10}
+        return 0, {"error": f"Request error occurred: {req_err}", "score": -10}
     except Exception as e:
-        details = {"error": f"An error occurred: {e}", "score": -10}
+        return 0, {"error": f"An error occurred: {e}", "score": -10}
+    return 0, {}
 
-    domain_parts = tldextract.extract(url)
-    domain = domain_parts.domain + '.' + domain_parts.suffix
-    if any(part in domain.lower() for part in event_name_lower.replace("de", "").split()):
-        score += 1
-    details["domain"] = domain
 
-    # WHOIS
-    try:
-        w = whois.whois(domain)
-        if w and any(
-            event_name_lower in str(v).lower() for v in [w.get('org'), w.get('name'), w.get('registrant_name')]
-        ):
-            score += 2
-            details["whois_org"] = w.get('org')
-    except:
-        details["whois_org"] = "N/A"
+def whois_signal(domain, event_name_lower):
+    w = lookup_whois(domain)
+    if w is None:
+        return 0, {"whois_org": "N/A"}
+    if w and any(
+        event_name_lower in str(v).lower() for v in [w.get('org'), w.get('name'), w.get('registrant_name')]
+    ):
+        return 2, {"whois_org": w.get('org')}
+    return 0, {}
 
-    # SSL Cert Org
+
+def ssl_signal(domain, event_name_lower):
     ssl_org = get_ssl_organization(domain)
     if ssl_org and event_name_lower in ssl_org.lower():
-        score += 2
-    details["ssl_org"] = ssl_org
+        return 2, {"ssl_org": ssl_org}
+    return 0, {"ssl_org": ssl_org}
+
 
+def ranking_signal(event_name, url):
     ranking = google_search_ranking_serper(event_name, url)
-    if ranking and ranking <= 10:  # If the URL appears in the top 10 results
-        score += 3  # High rank boosts the score
-    details["google_search_rank"] = ranking if ranking else "Not found in top 10"
+    points = 3 if ranking and ranking <= 10 else 0  # High rank boosts the score
+    return points, {"google_search_rank": ranking if ranking else "Not found in top 10"}
 
-    # Wikipedia Backlink Check - Optional (stub)
+
+def wikipedia_signal(event_name, url):
     # Could use a Wikipedia API or scraper to see if the URL appears on the event's page
-    score += wikipedia_link_score(event_name, url)
+    return wikipedia_link_score(event_name, url), {}
+
 
-    # Backlink Check
+def backlink_signal(url):
     backlinks = backlink_check.verify_url(url)
-    if backlinks:
-        score += 1
-    details["backlinks"] = backlinks
+    return (1 if backlinks else 0), {"backlinks": backlinks}
 
-    # Final trust score
-    details["event_name"] = event_name
-    details["url"] = url
-    details["score"] = score
 
-    return details
+def lookup_whois(domain):
+    """
+    WHOIS registrant fields of a registered domain, cached on disk.
+
+    Returns:
+        dict: The `org`, `name` and `registrant_name` fields, or None when the lookup failed.
+    """
+    def fetch():
+        try:
+            w = whois.whois(domain)
+        except:
+            return None
+        if not w:
+            return {}
+        return {field: _json_safe(w.get(field)) for field in ('org', 'name', 'registrant_name')}
+
+    return disk_cache.get_cache("lookups").cached("whois", domain, fetch, WHOIS_TTL, negative_ttl=NEGATIVE_TTL)
+
+
+def _json_safe(value):
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return str(value)
 
 
 def get_ssl_organization(domain):
+    """Organization of the domain's SSL certificate subject, cached on disk. None when unavailable."""
+    return disk_cache.get_cache("lookups").cached(
+        "ssl", domain, lambda: fetch_ssl_organization(domain), SSL_TTL, negative_ttl=NEGATIVE_TTL
+    )
+
+
+def fetch_ssl_organization(domain):
     try:
         ctx = ssl.create_default_context()
         with ctx.wrap_socket(socket.socket(), server_hostname=domain) as s:
@@ -139,15 +248,17 @@ def google_search_ranking(event_name, url):
     # Extract the domain from the provided URL
     parsed_url = urlparse(url)
     domain = parsed_url.netloc.lower()
-    redirected_url = url_phase.check_redirection(url)
-    redirected_domain = urlparse(redirected_url).netloc.lower()
+    # Resolve the URL and every result link in one parallel round
+    organic_results = search_results.get('organic_results', [])
+    resolved = url_phase.resolve_redirections([url] + [r['link'] for r in organic_results if 'link' in r])
+    redirected_domain = urlparse(resolved[url]).netloc.lower()
     # Check if either the original or redirected domain appears in the search results
 
     print(search_results)
-    for index, result_dic in enumerate(search_results.get('organic_results', [])):
+    for index, result_dic in enumerate(organic_results):
         if 'link' in result_dic:
             # print(f"Checking {result_dic['link']}")
-            result_url = url_phase.check_redirection(result_dic['link'])
+            result_url = resolved[result_dic['link']]
             result_domain = urlparse(result_url).netloc.lower()
 
             # If either the original or redirected domain matches
@@ -175,13 +286,15 @@ def google_search_ranking_serper(event_name, url):
     # Extract the domain from the provided URL
     parsed_url = urlparse(url)
     domain = parsed_url.netloc.lower()
-    redirected_url = url_phase.check_redirection(url)
-    redirected_domain = urlparse(redirected_url).netloc.lower()
+    # Resolve the URL and every result link in one parallel round
+    organic_results = search_results.get('organic', [])
+    resolved = url_phase.resolve_redirections([url] + [r['link'] for r in organic_results if 'link' in r])
+    redirected_domain = urlparse(resolved[url]).netloc.lower()
     # Check if either the original or redirected domain appears in the search results
-    for index, result_dic in enumerate(search_results.get('organic', [])):
+    for index, result_dic in enumerate(organic_results):
         if 'link' in result_dic:
             # print(f"Checking {result_dic['link']}")
-            result_url = url_phase.check_redirection(result_dic['link'])
+            result_url = resolved[result_dic['link']]
             result_domain = urlparse(result_url).netloc.lower()
 
             # If either the original or redirected domain matches
@@ -192,7 +305,7 @@ def google_search_ranking_serper(event_name, url):
 
 
 def get_wikipedia_external_links(url_wiki):
-    response = requests.get(url_wiki)
+    response = http_client.get(url_wiki)
     response.raise_for_status()
     if response.status_code != 200:
         print("Failed to fetch Wikipedia page")
@@ -205,15 +318,21 @@ def get_wikipedia_external_links(url_wiki):
         for tr in infobox.find_all("tr"):
             for th in tr.find_all("th", class_="infobox-label"):
                 if "Web site" in th.text:
-                    table_sections.append(url_phase.check_redirection(tr.a.get("href")))
+                    table_sections.append(tr.a.get("href"))
 
     # Extract external links
     ext_links = []
     external_span = soup.find(id="External_links").find_all_next("span", class_="official-website")
     for ext_a in external_span:
         for a in ext_a.find_all("a", href=True):
-            ext_links.append(url_phase.check_redirection(a.get("href")))
-    return {"table_sections": table_sections, "external_links": ext_links}
+            ext_links.append(a.get("href"))
+
+    # Resolve every collected link in one parallel round
+    resolved = url_phase.resolve_redirections(table_sections + ext_links)
+    return {
+        "table_sections": [resolved[link] for link in table_sections],
+        "external_links": [resolved[link] for link in ext_links],
+    }
 
 
 def calculate_weighted_score(external_links, table_sections, url):
@@ -252,7 +371,7 @@ def wikipedia_link_score(tour_name, url):
 
 def extract_official_website(wiki_url: str) -> str | None:
     """Extract the official website from the Wikipedia page."""
-    response = requests.get(wiki_url, headers={"User-Agent": "Mozilla/5.0"})
+    response = http_client.get(wiki_url, headers={"User-Agent": "Mozilla/5.0"})
     if response.status_code != 200:
         return None
     soup = BeautifulSoup(response.text, "html.parser")
@@ -1,4 +1,47 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
 import requests
+from cachetools import TTLCache
+
+from src import http_client
+
+REDIRECT_TIMEOUT = 5
+REDIRECT_CACHE_SIZE = 4096
+REDIRECT_CACHE_TTL = 6 * 3600
+MAX_RESOLVE_WORKERS = 10
+
+# LRU+TTL cache of resolved redirect chains
+_redirect_cache = TTLCache(maxsize=REDIRECT_CACHE_SIZE, ttl=REDIRECT_CACHE_TTL)
+_redirect_cache_lock = threading.Lock()
+
+
+def get_redirect_chain(url):
+    """
+    Follow the redirects of a URL with a HEAD request and record every hop.
+
+    Args:
+        url (str): The URL to check for redirection.
+
+    Returns:
+        list: The URLs visited in order, starting with `url` and ending with the final URL.
+              Only `[url]` when the request fails.
+    """
+    with _redirect_cache_lock:
+        chain = _redirect_cache.get(url)
+    if chain is not None:
+        return list(chain)
+
+    try:
+        response = http_client.head(url, allow_redirects=True, timeout=REDIRECT_TIMEOUT)
+    except requests.RequestException:
+        return [url]  # In case of error, return the original URL (not cached, it may be transient)
+
+    chain = [hop.url for hop in response.history] + [response.url]
+    with _redirect_cache_lock:
+        _redirect_cache[url] = tuple(chain)
+    return chain
 
 
 def check_redirection(url):
@@ -11,8 +54,25 @@ def check_redirection(url):
     Returns:
         str: The final redirected URL after following redirects, or the original URL if no redirection.
     """
-    try:
-        response = requests.head(url, allow_redirects=True, timeout=5)
-        return response.url
-    except requests.RequestException:
-        return url  # In case of error, return the original URL
+    return get_redirect_chain(url)[-1]
+
+
+def resolve_redirections(urls: Iterable[str], max_workers: int = MAX_RESOLVE_WORKERS) -> dict[str, str]:
+    """
+    Resolve the final URL of many URLs at once.
+
+    Cached URLs are answered immediately; the rest are resolved with concurrent HEAD requests
+    over the shared keep-alive connection pools, so a list of search results costs one parallel round.
+
+    Args:
+        urls: The URLs to resolve; duplicates are resolved once.
+        max_workers: Maximum number of HEAD requests in flight.
+
+    Returns:
+        dict: Original URL -> final URL, in the order the URLs were given.
+    """
+    unique_urls = list(dict.fromkeys(urls))
+    if len(unique_urls) <= 1:
+        return {url: check_redirection(url) for url in unique_urls}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_urls))) as executor:
+        return dict(zip(unique_urls, executor.map(check_redirection, unique_urls)))